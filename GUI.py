@@ -3,11 +3,14 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import json
 import os
 from datetime import datetime
-from JLTool import JLToolMain
+from JLTool import JLToolMain, RUN_JOURNAL, LIBRARY_INDEX
+from tools.file import collect_all_files, LRC_EXTS
+from tools.lrc import warmup
+from tools.stats import ProgressStats, format_duration
 import logging
+import multiprocessing
 import threading
 import queue
-import traceback
 
 # 配置项映射关系
 SEQ_OPTIONS = [
@@ -24,14 +27,17 @@ SEQ_MAP = {
     "罗马音注音": "roma",
     "禁用": ""
 }
+LOG_MAX_LINES = 5000  # 日志框只保留最近的行数，完整日志见logs目录
+STATS_INTERVAL = 500  # 统计信息刷新间隔（毫秒）
 
 
 class TextHandler(logging.Handler):
-    """自定义logging handler，将日志输出到tkinter文本框"""
+    """自定义logging handler，将日志输出到tkinter文本框，文本框只保留最近max_lines行"""
 
-    def __init__(self, text_widget):
+    def __init__(self, text_widget, max_lines=LOG_MAX_LINES):
         super().__init__()
         self.text_widget = text_widget
+        self.max_lines = max_lines
         self.queue = queue.Queue()
 
     def emit(self, record):
@@ -39,14 +45,20 @@ class TextHandler(logging.Handler):
         self.queue.put(msg)
 
     def flush_queue(self):
-        """处理队列中的所有消息"""
-        while not self.queue.empty():
+        """取出队列中的所有消息，一次插入并滚动，超出max_lines的旧行被删除"""
+        msgs = []
+        while True:
             try:
-                msg = self.queue.get_nowait()
-                self.text_widget.insert(tk.END, msg + '\n')
-                self.text_widget.see(tk.END)
+                msgs.append(self.queue.get_nowait())
             except queue.Empty:
                 break
+        if not msgs:
+            return
+        self.text_widget.insert(tk.END, "\n".join(msgs[-self.max_lines:]) + "\n")
+        lines = int(self.text_widget.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            self.text_widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        self.text_widget.see(tk.END)
 
 
 class ConfigEditor(tk.Tk):
@@ -55,12 +67,8 @@ class ConfigEditor(tk.Tk):
         self.title("日语音乐歌词注音工具")
         self.config_path = "config.json"
         self.config = self.load_config()
-        self.total_files = 0
-        self.processed_files = 0
-        self.success_count = 0
-        self.fail_count = 0
-        self.other_count = 0
-        self.error_count = 0
+        # 处理线程写入、界面定时读取的进度统计
+        self.progress = ProgressStats()
 
         # 日志相关
         self.log_queue = queue.Queue()
@@ -70,6 +78,7 @@ class ConfigEditor(tk.Tk):
 
         self.jlmain = None
         self.jlmain: JLToolMain
+        self.processing = False  # 处理线程运行中，状态栏随进度刷新
         self.create_widgets()
         self.load_config_to_gui()
         self.setup_logging()
@@ -77,6 +86,20 @@ class ConfigEditor(tk.Tk):
 
         # 启动日志队列处理
         self.after(100, self.process_log_queue)
+        self.after(STATS_INTERVAL, self.poll_stats)
+        # 窗口显示后在后台加载词典与模型
+        self.after(200, self.start_warmup)
+
+    def start_warmup(self):
+        """后台预加载注音词典、繁简转换与语言识别模型"""
+        def run():
+            try:
+                warmup()
+                logging.debug("词典加载完成")
+            except Exception as e:
+                logging.error(f"词典加载失败: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
 
     def setup_logging(self):
         """设置日志系统"""
@@ -130,7 +153,12 @@ class ConfigEditor(tk.Tk):
         default_config = {
             "seq": "chin-hira-kanji",
             "ds_key": "",
-            "last_folder": ""
+            "last_folder": "",
+            "workers": 1,
+            "pack_tokens": 0,
+            "ds_stream": False,
+            "resume": False,
+            "library_index": False
         }
         try:
             if os.path.exists(self.config_path):
@@ -211,7 +239,10 @@ class ConfigEditor(tk.Tk):
             ("缺陷:", "defect", "0"),
             ("其他:", "other", "0"),
             ("错误:", "error", "0"),
-            ("成功率:", "rate", "0%")
+            ("成功率:", "rate", "0%"),
+            ("速度:", "speed", "0.00 文件/秒"),
+            ("平均耗时:", "avg", "0.00 秒"),
+            ("剩余时间:", "eta", "--")
         ]
 
         for i, (label, key, default) in enumerate(stats_data):
@@ -233,6 +264,13 @@ class ConfigEditor(tk.Tk):
         self.clear_log_btn = ttk.Button(control_frame, text="清空日志", command=self.clear_log)
         self.clear_log_btn.pack(side="left", padx=5)
 
+        ttk.Label(control_frame, text="并行数:").pack(side="left", padx=(5, 0))
+        self.workers_spin = ttk.Spinbox(control_frame, from_=1, to=max(os.cpu_count() or 1, 16), width=3)
+        self.workers_spin.pack(side="left", padx=5)
+
+        self.resume_var = tk.BooleanVar()
+        ttk.Checkbutton(control_frame, text="跳过已完成", variable=self.resume_var).pack(side="left", padx=5)
+
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(control_frame, variable=self.progress_var, length=200)
         self.progress_bar.pack(side="left", padx=5, fill="x", expand=True)
@@ -289,6 +327,10 @@ class ConfigEditor(tk.Tk):
             self.ds_check.invoke()
             self.ds_check.invoke()
 
+        # 加载并行数配置
+        self.workers_spin.set(self.config.get("workers", 1))
+        self.resume_var.set(self.config.get("resume", False))
+
     def toggle_ds_key(self, event=None):
         """根据复选框状态切换API密钥输入框状态"""
         if "selected" in self.ds_check.state():
@@ -301,7 +343,7 @@ class ConfigEditor(tk.Tk):
         initial_dir = self.config.get("last_folder") or os.path.expanduser("~")
         files = filedialog.askopenfilenames(
             initialdir=initial_dir,
-            filetypes=[("支持的文件", "*.mp3 *.flac *.opus *.txt *.lrc"), ("所有文件", "*.*")]
+            filetypes=[("支持的文件", " ".join("*" + ext for ext in LRC_EXTS)), ("所有文件", "*.*")]
         )
         if files:
             self.config["last_folder"] = os.path.dirname(files[0])
@@ -347,80 +389,45 @@ class ConfigEditor(tk.Tk):
         logging.getLogger().setLevel(getattr(logging, level))
         logging.info(f"日志级别已更改为: {level}")
 
+    def poll_stats(self):
+        """定时读取进度统计并刷新界面（只在主线程中操作控件）"""
+        self.update_stats()
+        self.after(STATS_INTERVAL, self.poll_stats)
+
     def update_stats(self):
         """更新统计信息"""
-        self.stats_labels["total"].config(text=str(self.total_files))
-        self.stats_labels["processed"].config(text=str(self.processed_files))
-        self.stats_labels["success"].config(text=str(self.success_count))
-        self.stats_labels["defect"].config(text=str(self.fail_count))
-        self.stats_labels["other"].config(text=str(self.other_count))
-        self.stats_labels["error"].config(text=str(self.error_count))
+        snap = self.progress.snapshot()
+        total, done, counts = snap["total"], snap["done"], snap["counts"]
+        self.stats_labels["total"].config(text=str(total))
+        self.stats_labels["processed"].config(text=str(done))
+        for key in ("success", "defect", "other", "error"):
+            self.stats_labels[key].config(text=str(counts.get(key, 0)))
 
         # 计算成功率
-        if self.processed_files > 0:
-            success_rate = (self.success_count / self.processed_files) * 100
+        if done > 0:
+            success_rate = (counts.get("success", 0) / done) * 100
             self.stats_labels["rate"].config(text=f"{success_rate:.1f}%")
         else:
             self.stats_labels["rate"].config(text="0%")
+        self.stats_labels["speed"].config(text=f"{snap['rate']:.2f} 文件/秒")
+        self.stats_labels["avg"].config(text=f"{snap['avg']:.2f} 秒")
+        self.stats_labels["eta"].config(text=format_duration(snap["eta"]) if done < total else "--")
 
         # 更新进度条
-        if self.total_files > 0:
-            progress = (self.processed_files / self.total_files) * 100
+        if total > 0:
+            progress = (done / total) * 100
             self.progress_var.set(progress)
-            self.progress_label.config(text=f"{self.processed_files}/{self.total_files} 文件")
+            self.progress_label.config(text=f"{done}/{total} 文件")
 
             # 更新状态栏
-            if self.processed_files < self.total_files:
-                self.status_bar.config(text=f"处理中... {self.processed_files}/{self.total_files}")
+            if not self.processing:
+                pass
+            elif done < total:
+                self.status_bar.config(text=f"处理中... {done}/{total} 剩余: {format_duration(snap['eta'])}")
             else:
                 self.status_bar.config(
-                    text=f"处理完成！成功: {self.success_count}, 缺陷: {self.fail_count}, 错误: {self.error_count}")
-
-    def collect_all_files(self, paths):
-        """从路径列表中收集所有有效文件"""
-        valid_files = []
-        for path_str in paths:
-            path_str = path_str.strip()
-            if not path_str:
-                continue
-            if not os.path.exists(path_str):
-                logging.warning(f"路径不存在: {path_str}")
-                continue
-            if os.path.isfile(path_str):
-                if path_str.lower().endswith((".mp3", ".flac", ".opus", ".txt", ".lrc")):
-                    valid_files.append(path_str)
-                else:
-                    logging.warning(f"不支持的文件格式: {path_str}")
-            elif os.path.isdir(path_str):
-                for root, _, files in os.walk(path_str):
-                    for file in files:
-                        if file.lower().endswith((".mp3", ".flac", ".opus", ".txt", ".lrc")):
-                            valid_files.append(os.path.join(root, file))
-        return valid_files
-
-    def process_single_file(self, file_path, index):
-        """处理单个文件"""
-        try:
-            logging.info(f"开始处理文件 [{index + 1}/{self.total_files}]: {os.path.basename(file_path)}")
-            result = self.jlmain.start(file_path)
-
-            if result == "success":
-                self.success_count += 1
-            elif result == "defect":
-                self.fail_count += 1
-            elif result == "other":
-                self.other_count += 1
-            else:
-                self.error_count += 1
-
-        except Exception as e:
-            errinfo = str(e) + "\n" + traceback.format_exc()
-
-            self.error_count += 1
-            logging.error(f"处理异常: {os.path.basename(file_path)} - {errinfo}")
-
-        self.processed_files += 1
-        self.update_stats()
+                    text=f"处理完成！成功: {counts.get('success', 0)}, 缺陷: {counts.get('defect', 0)}, "
+                         f"错误: {counts.get('error', 0)}")
 
     def start_process(self):
         """开始处理任务"""
@@ -439,7 +446,7 @@ class ConfigEditor(tk.Tk):
             return
 
         # 收集有效文件
-        valid_files = self.collect_all_files(paths)
+        valid_files = collect_all_files(paths)
         if not valid_files:
             messagebox.showwarning("警告", "没有找到有效文件")
             self.start_btn.config(state="normal")
@@ -456,57 +463,92 @@ class ConfigEditor(tk.Tk):
                 self.clear_log_btn.config(state="normal")
                 return
 
-        # 初始化工具
-        self.jlmain = JLToolMain(self.config["seq"], logging, ds_key)
-
-        # 初始化任务状态
-        self.total_files = len(valid_files)
-        self.processed_files = 0
-        self.success_count = 0
-        self.fail_count = 0
-        self.other_count = 0
-        self.error_count = 0
-
-        self.update_stats()
-        logging.info("=" * 50)
-        logging.info(f"开始批量处理 {self.total_files} 个文件")
-        logging.info(f"序列配置: {self.config['seq']}")
-        if ds_key:
-            logging.info("使用Deepseek翻译")
-        logging.info("=" * 50)
+        workers = self.config["workers"]
+        self.progress.reset()
+        self.status_bar.config(text="正在加载词典...")
 
         # 使用线程处理文件
         def process_in_thread():
-            for i, file_path in enumerate(valid_files):
-                self.process_single_file(file_path, i)
-
-            # 处理完成
-            logging.info("=" * 50)
-            logging.info(f"批量处理完成!")
-            logging.info(f"总计: {self.total_files} 个文件")
-            logging.info(
-                f"成功: {self.success_count}, 缺陷: {self.fail_count}, 其他: {self.other_count}, 错误: {self.error_count}")
-
-            # 在主线程中更新UI
-            self.after(0, self.on_process_complete)
+            nonlocal valid_files
+            jlmain, error = None, None
+            try:
+                # 初始化工具（词典可能仍在后台加载，不阻塞界面）
+                jlmain = self.jlmain = JLToolMain(self.config["seq"], logging, ds_key, workers=workers,
+                                                  pack_tokens=self.config["pack_tokens"], journal=RUN_JOURNAL,
+                                                  index=LIBRARY_INDEX if self.config["library_index"] else "",
+                                                  progress=self.progress,
+                                                  stream=self.config["ds_stream"])
+                if self.config["resume"]:
+                    valid_files = jlmain.pending(valid_files)
+
+                # 初始化任务状态
+                self.progress.reset(len(valid_files))
+                logging.info("=" * 50)
+                logging.info(f"开始批量处理 {len(valid_files)} 个文件")
+                logging.info(f"序列配置: {self.config['seq']}")
+                if ds_key:
+                    logging.info("使用Deepseek翻译")
+                logging.info("=" * 50)
+
+                if workers > 1:
+                    logging.info(f"并行处理: {workers} 个{'线程' if ds_key else '进程'}")
+                    for _ in jlmain.start_pool(valid_files, workers):
+                        pass
+                else:
+                    for i, file_path in enumerate(valid_files):
+                        logging.info(f"开始处理文件 [{i + 1}/{len(valid_files)}]: {os.path.basename(file_path)}")
+                        jlmain.safe_start(file_path)
+            except Exception as e:
+                logging.exception(f"批量处理失败: {e}")
+                error = e
+            finally:
+                if jlmain is not None:
+                    try:
+                        jlmain.close()
+                    except Exception as e:
+                        logging.exception(f"关闭失败: {e}")
+
+            if error is None:
+                # 处理完成
+                counts = self.progress.snapshot()["counts"]
+                logging.info("=" * 50)
+                logging.info(f"批量处理完成!")
+                logging.info(f"总计: {len(valid_files)} 个文件")
+                logging.info(
+                    f"成功: {counts.get('success', 0)}, 缺陷: {counts.get('defect', 0)}, "
+                    f"其他: {counts.get('other', 0)}, 错误: {counts.get('error', 0)}")
+                logging.info(self.progress.summary())
+
+            # 在主线程中更新UI（失败时同样恢复按钮）
+            self.after(0, self.on_process_complete, error)
 
         # 启动处理线程
+        self.processing = True
         thread = threading.Thread(target=process_in_thread, daemon=True)
         thread.start()
 
-    def on_process_complete(self):
-        """处理完成后的回调"""
+    def on_process_complete(self, error=None):
+        """处理完成（或失败）后的回调"""
         self.start_btn.config(state="normal")
         self.clear_log_btn.config(state="normal")
 
+        self.update_stats()
+        self.processing = False
+        if error is not None:
+            self.status_bar.config(text=f"处理失败: {error}")
+            messagebox.showerror("处理失败", f"批量处理失败，详细信息见日志:\n{error}")
+            return
         # 显示完成消息
+        snap = self.progress.snapshot()
+        counts = snap["counts"]
         messagebox.showinfo("处理完成",
                             f"处理完成!\n\n"
-                            f"总计: {self.total_files} 个文件\n"
-                            f"成功: {self.success_count}\n"
-                            f"缺陷: {self.fail_count}\n"
-                            f"其他: {self.other_count}\n"
-                            f"错误: {self.error_count}")
+                            f"总计: {snap['total']} 个文件\n"
+                            f"成功: {counts.get('success', 0)}\n"
+                            f"缺陷: {counts.get('defect', 0)}\n"
+                            f"其他: {counts.get('other', 0)}\n"
+                            f"错误: {counts.get('error', 0)}\n"
+                            f"用时: {format_duration(snap['elapsed'])}")
 
         # 记录到日志文件
         logging.info(f"处理统计已保存到日志文件: {self.current_log_file}")
@@ -524,6 +566,13 @@ class ConfigEditor(tk.Tk):
         # 保存Deepseek配置
         self.config["ds_key"] = self.ds_key_entry.get().strip() if "selected" in self.ds_check.state() else ""
 
+        # 保存并行数配置
+        try:
+            self.config["workers"] = max(1, int(self.workers_spin.get()))
+        except ValueError:
+            self.config["workers"] = 1
+        self.config["resume"] = self.resume_var.get()
+
         logging.info("配置已保存")
 
     def on_close(self):
@@ -535,6 +584,7 @@ class ConfigEditor(tk.Tk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # pyinstaller打包后，进程池子进程不重新启动整个界面
     app = ConfigEditor()
     app.geometry("1110x700")
     app.mainloop()
\ No newline at end of file
@@ -1,22 +1,91 @@
-from os import path, makedirs
+from os import path, makedirs, cpu_count, environ
 from datetime import datetime
-from tools.lrc import (listsort, LyrTrans, lrc_split, check_jap,
-                       arrangelines, get_lrc_root, movefile)
-from tools.file import MusicLrcEditor
+import argparse
+import json
+import logging
+import sys
+import multiprocessing
+import traceback
+from time import perf_counter
+from contextlib import nullcontext, redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging.handlers import QueueHandler, QueueListener
+from tools.lrc import (LyrTrans, check_jap, arrangelines, get_lrc_root, movefile, warmup)
+from tools.file import MusicLrcEditor, collect_all_files
+from tools.lyric import LyricDocument
 from tools.dsapi import DSAPI
+from tools.packer import RequestPacker
+from tools.journal import RunJournal
+from tools.index import LibraryIndex
+from tools.stats import ProgressStats
+from tools.timing import StageTimer
+from tools.scan import SCAN_WORKERS, scan_files, read_list, write_list
+
+
+READING_CACHE = "cache/readings.db"
+RUN_JOURNAL = "logs/journal.jsonl"
+LIBRARY_INDEX = "cache/library.db"
+_worker = None  # 进程池中每个子进程持有的JLToolMain实例
+
+
+def _pool_init(seq, lrc_backup, journal, index, profile_top, log_queue, log_level):
+    """进程池子进程初始化：日志按主进程的级别转发回主进程，分析器每个进程只构建一次；
+    profile_top为None时不计时，否则同StageTimer的参数"""
+    global _worker
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(log_level)  # spawn启动的子进程默认为WARNING，INFO日志会被丢弃
+    sys.stdout = sys.stderr  # 子进程不输出结果，诊断信息不混入标准输出的JSON
+    if _worker is None:  # fork方式启动时已从主进程继承
+        _worker = JLToolMain(seq, logging, lrc_backup=lrc_backup, journal=journal, index=index,
+                             timer=StageTimer(profile_top) if profile_top is not None else None)
+    _worker.kks.cache.take_stats()  # 不重复统计继承自主进程的计数
+    warmup()
+
+
+def _pool_run(in_path):
+    """子进程中处理单个文件，返回 (路径, 结果, 注音缓存命中统计, 耗时, 分阶段计时)"""
+    t0 = perf_counter()
+    if _worker.timer is not None:
+        _worker.timer.start(in_path)
+    try:
+        result = _worker.kks_main(in_path)
+    except Exception as e:
+        logging.error(f"处理异常: {path.basename(in_path)} - {e}\n{traceback.format_exc()}")
+        result = "error"
+    timing = _worker.timer.stop(result) if _worker.timer is not None else None
+    return in_path, result, _worker.kks.cache.take_stats(), perf_counter() - t0, timing
 
 
 class JLToolMain:
-    def __init__(self, seq, logging, ds_key=""):
+    def __init__(self, seq, logging, ds_key="", lrc_backup="", workers=1, pack_tokens=0, journal="", index="",
+                 progress=None, timer=None, stream=False):
         self.logging = logging
         self.seq = seq.split("-")  # 默认使用kks版本
-        self.kks = LyrTrans()
+        self.kks = LyrTrans(READING_CACHE)
         self.ds_key = ds_key
-        self.lrc_backup = "lyrics/lrc" + datetime.now().strftime("%Y-%m-%d %H-%M-%S")
+        self.workers = workers
+        self.lrc_backup = lrc_backup or "lyrics/lrc" + datetime.now().strftime("%Y-%m-%d %H-%M-%S")
         if not path.exists(self.lrc_backup):
             makedirs(self.lrc_backup)
+        # 运行记录，用于中断后续传
+        self.journal = RunJournal(journal, seq, "ds" if ds_key else "kks") if journal else None
+        # 音乐库索引，记录每个文件最近一次的处理结果
+        self.index = LibraryIndex(index) if index else None
+        # 进度统计（ProgressStats），每完成一个文件记录结果与耗时
+        self.progress = progress
+        # 分阶段计时（StageTimer），为None时不计时
+        self.timer = timer
         if self.ds_key:
-            self.dsapi = DSAPI(ds_key)
+            self.dsapi = DSAPI(ds_key, stream=stream)
+            # 同一文件的hira/roma/chin请求并发发出
+            self.ds_pool = ThreadPoolExecutor(3 * max(1, workers))
+            # 多首歌合并请求，pack_tokens为单个请求的token预算，0为不合并；
+            # 只处理一个文件时没有可合并的请求，不合并以免每次等待linger
+            self.packer = RequestPacker(self.dsapi, self.ds_pool, pack_tokens) \
+                if pack_tokens and workers > 1 else None
 
     def start(self, in_path):
         """主处理函数，根据版本调用不同实现"""
@@ -25,161 +94,386 @@ class JLToolMain:
         else:
             return self.kks_main(in_path)
 
+    def safe_start(self, in_path):
+        """处理单个文件，异常记录到日志并视为error"""
+        t0 = perf_counter()
+        if self.timer is not None:
+            self.timer.start(in_path)
+        try:
+            result = self.start(in_path)
+        except Exception as e:
+            self.logging.error(f"处理异常: {path.basename(in_path)} - {e}\n{traceback.format_exc()}")
+            result = "error"
+        if self.timer is not None:
+            self.timer.add(*self.timer.stop(result))
+        if self.progress is not None:
+            self.progress.add(result, perf_counter() - t0)
+        return result
+
+    def start_pool(self, in_paths, workers=0):
+        """并行批量处理，按完成顺序逐个返回 (路径, 结果)
+        本地模式使用多进程，DS模式使用线程池同时处理workers个文件；
+        workers为0时使用初始化时的并行数"""
+        workers = workers or self.workers or cpu_count() or 1
+        if workers <= 1 or len(in_paths) <= 1:
+            for in_path in in_paths:
+                yield in_path, self.safe_start(in_path)
+            return
+        if self.ds_key:
+            # DS模式几乎全是网络等待，用线程即可
+            with ThreadPoolExecutor(workers) as pool:
+                futures = {pool.submit(self.safe_start, in_path): in_path for in_path in in_paths}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            return
+        global _worker
+        # 优先使用fork，在主进程中预加载词典后子进程可直接共享
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+        if ctx.get_start_method() == "fork":
+            warmup()
+            _worker = self
+        log_queue = ctx.Queue()
+        listener = QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+        listener.start()
+        try:
+            with ctx.Pool(min(workers, len(in_paths)), _pool_init,
+                          ("-".join(self.seq), self.lrc_backup,
+                           self.journal.path if self.journal else "",
+                           self.index.db_path if self.index else "",
+                           self.timer.profile_top if self.timer is not None else None, log_queue,
+                           logging.getLogger().getEffectiveLevel())) as pool:
+                for in_path, result, stats, elapsed, timing in pool.imap_unordered(_pool_run, in_paths):
+                    self.kks.cache.add_stats(*stats)
+                    if timing is not None:
+                        self.timer.add(*timing)
+                    if self.progress is not None:
+                        self.progress.add(result, elapsed)
+                    yield in_path, result
+        finally:
+            listener.stop()
+            _worker = None
+
+    def pending(self, in_paths):
+        """续传：过滤掉运行记录中已以相同seq/mode完成的文件"""
+        if self.journal is None:
+            return list(in_paths)
+        files = self.journal.pending(in_paths)
+        if len(files) != len(in_paths):
+            self.logging.info(f"跳过已完成文件 {len(in_paths) - len(files)} 个")
+        return files
+
+    def finish(self, in_path, dire, lines=None, move=True):
+        """移动文件到结果目录并写入运行记录，返回结果"""
+        with self.stage("move"):
+            dest = movefile(in_path, dire) if move else in_path
+        with self.stage("record"):
+            if self.journal is not None:
+                self.journal.record(in_path, dest, dire, lines)
+            if self.index is not None:
+                self.index.record(in_path, dest, dire, "-".join(self.seq), "ds" if self.ds_key else "kks", lines)
+        return dire
+
+    def stage(self, name):
+        """分阶段计时，未开启计时时不做任何事"""
+        return self.timer.stage(name) if self.timer is not None else nullcontext()
+
+    def close(self):
+        """结束批量处理：记录缓存统计并关闭缓存与线程池"""
+        self.logging.info(self.kks.cache.stats())
+        self.kks.cache.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.index is not None:
+            self.index.close()
+        if self.ds_key:
+            self.ds_pool.shutdown()
+            if self.dsapi.cache is not None:
+                self.logging.info(self.dsapi.cache.stats())
+            self.dsapi.close()
+
     def kks_main(self, in_path):
         """KKS版本处理逻辑"""
-        mle = MusicLrcEditor(in_path)
+        with self.stage("read_tags"):
+            mle = MusicLrcEditor(in_path)
         if not mle.isreadlrc():
             self.logging.error(f"读取异常:{in_path}")
-            return "error"
+            return self.finish(in_path, "error", move=False)
         else:
-            lrc = mle.read_lyrics()
+            with self.stage("read_tags"):
+                lrc = mle.read_lyrics()
             if not lrc:
-                movefile(in_path, "error")
-                return "error"
-            prefix, root, invalid = lrc_split(lrc)
-            if not root:
+                return self.finish(in_path, "error")
+            with self.stage("parse"):
+                doc = LyricDocument.parse(lrc)
+            if not doc.lines:
                 self.logging.info(f"非同步歌词:{in_path}")
-                movefile(in_path, "other")
-                return "other"
-            if not check_jap(root):
+                return self.finish(in_path, "other", lrc)
+            with self.stage("classify"):
+                is_jap = check_jap(doc.texts())
+            if not is_jap:
                 self.logging.info(f"不为日语歌词:{in_path}")
-                movefile(in_path, "other")
-                return "other"
+                return self.finish(in_path, "other", lrc)
             else:
-                if invalid:
-                    self.logging.info("\n".join([f"无效行:{in_path}"] + invalid))
-                root, flag = self.lrclines_trans(root)
-                mle.lrc = prefix + root
+                if doc.invalid:
+                    self.logging.info("\n".join([f"无效行:{in_path}"] + doc.invalid))
+                doc.output, flag = self.lrclines_trans(doc.lines)
+                mle.lrc = doc
                 out_path = path.join(self.lrc_backup, path.splitext(path.split(in_path)[1])[0]) + ".lrc"
-                with open(out_path, 'w+', encoding='utf-8') as f:
-                    f.writelines(lrc)
-                if mle.write_lyrics():
+                with self.stage("backup"):
+                    with open(out_path, 'w+', encoding='utf-8') as f:
+                        f.writelines(lrc)
+                with self.stage("write_tags"):
+                    written = mle.write_lyrics()
+                if written:
                     if flag:
-                        movefile(in_path, "defect")
-                        return "defect"
+                        return self.finish(in_path, "defect", doc.to_lines())
                     else:
                         self.logging.info(f"处理完成:{in_path}")
-                        movefile(in_path, "success")
-                        return "success"
-
-    def lrclines_trans(self, _in_lines: list):
-        times, _ = zip(*_in_lines)
-        times = list(dict.fromkeys(times))
-        praline = []
-        for time in times:
-            line = [f"[{time}]"]
-            for t, l in _in_lines:
-                if time == t:
-                    line.append(l)
-            praline.append(line)
-        res = arrangelines(praline)
+                        return self.finish(in_path, "success", doc.to_lines())
+                self.logging.error(f"写入歌词失败:{in_path}")
+                return self.finish(in_path, "error", move=False)
+
+    def lrclines_trans(self, lines: list):
+        """整理各时间戳的候选行并按seq生成注音，返回 ([(毫秒, 文本), ...], 是否有缺陷)"""
+        with self.stage("arrange"):
+            res = arrangelines(lines)
         flag = False
-        if len(res) != len(praline):
+        if len(res) != len(lines):
             flag = True
         if "chin" in self.seq:
-            if ((not res[0][2]) and res[0][0]) and (res[-1][2] and (not res[-1][0])):
-                l0, l1, l2, l3, l4 = [list(row) for row in zip(*res)]
-                l0 = l0[:-1]
-                l1 = l1[:-1]
-                l2 = l2[1:]
-                l3 = l3[:-1]
-                l4 = l4[:-1]
-                res = [list(row) for row in zip(*[l0, l1, l2, l3, l4])]
+            if ((not res[0].chin) and res[0].tag) and (res[-1].chin and (not res[-1].tag)):
+                for prev, line in zip(res, res[1:]):
+                    prev.chin = line.chin
+                res = res[:-1]
                 self.logging.info("整理滞后翻译行")
+        # 需要注音的行一次性批量解析
+        seqs = [i for i in ("hira", "roma") if i in self.seq]
+        roots = [line.root for line in res
+                 if ("hira" in seqs and not line.hira) or ("roma" in seqs and not line.roma)]
+        with self.stage("annotate"):
+            trans = self.kks.trans_lines(roots, seqs) if roots else {}
+        trans = {i: dict(zip(roots, trans[i])) for i in trans}
         _list = []
-        for item in res:
-            time, root, chin, hira, roma = item
+        for line in res:
+            time, root = line.time, line.root
             for i in self.seq:
                 if i == "kanji":
                     if root:
-                        _list.append(time + root)
+                        _list.append((time, root))
                 elif i == "hira":
-                    if not hira:
-                        hira = self.kks.trans(root)
-                    if hira != root:
-                        _list.append(time + hira)
+                    if not line.hira:
+                        line.hira = trans["hira"][root]
+                    if line.hira != root:
+                        _list.append((time, line.hira))
                 elif i == "chin":
-                    if chin:
-                        _list.append(time + chin)
+                    if line.chin:
+                        _list.append((time, line.chin))
                 elif i == "roma":
-                    if not roma:
-                        roma = self.kks.trans(root, "roma")
-                    if roma != root:
-                        _list.append(time + roma)
+                    if not line.roma:
+                        line.roma = trans["roma"][root]
+                    if line.roma != root:
+                        _list.append((time, line.roma))
         return _list, flag
 
     def ds_main(self, in_path):
         """DS版本处理逻辑"""
-        mle = MusicLrcEditor(in_path)
-        if mle.isreadlrc():
+        with self.stage("read_tags"):
+            mle = MusicLrcEditor(in_path)
+        if not mle.isreadlrc():
             self.logging.error(f"读取异常:{in_path}")
-            return "error"
+            return self.finish(in_path, "error", move=False)
         else:
-            lrc = mle.read_lyrics()
+            with self.stage("read_tags"):
+                lrc = mle.read_lyrics()
             if not lrc:
-                movefile(in_path, "error")
-                return "error"
-            prefix, root, invalid = lrc_split(lrc)
-            if not root:
+                return self.finish(in_path, "error")
+            with self.stage("parse"):
+                doc = LyricDocument.parse(lrc)
+            if not doc.lines:
                 self.logging.info(f"非同步歌词:{in_path}")
-                movefile(in_path, "other")
-                return "other"
-            elif invalid:
-                self.logging.info("\n".join([f"无效行:{in_path}"] + invalid))
+                return self.finish(in_path, "other", lrc)
+            elif doc.invalid:
+                self.logging.info("\n".join([f"无效行:{in_path}"] + doc.invalid))
 
-            if not check_jap(root):
+            with self.stage("classify"):
+                is_jap = check_jap(doc.texts())
+            if not is_jap:
                 self.logging.info(f"不为日语歌词:{in_path}")
-                movefile(in_path, "other")
-                return "other"
+                return self.finish(in_path, "other", lrc)
             else:
-                times, texts = zip(*get_lrc_root(root))
-                times, texts = list(times), list(map(
-                    lambda line: line.replace("\u3000", " ").replace("　", " ").strip(), texts))
-                flag = 0
-                texts = [list(row) for row in zip(*[times, texts])]
-                for item in self.seq:
-                    if item == "hira":
-                        inp = list(texts)
-                        texts = self.dsapi.get_hira(texts, in_path)
-                        if len(inp) != len(texts):
-                            flag += 1
-                    elif item == "kanji":
-                        texts = [list(row) for row in zip(*texts)]
-                        texts += [texts[1]]
-                        texts = [list(row) for row in zip(*texts)]
-                    elif item == "roma":
-                        inp = list(texts)
-                        texts = self.dsapi.get_roma(texts, in_path)
-                        if len(inp) != len(texts):
-                            flag += 1
-                    elif item == "chin":
-                        inp = list(texts)
-                        texts = self.dsapi.get_trans(texts, in_path)
-                        if len(inp) != len(texts):
-                            flag += 1
-
-                lrc_list = prefix
-                texts = listsort(texts)
-                for ls in texts:
-                    tt = f"[{ls[0]}]"
-                    for i in ls[2:]:
-                        ti = tt + i
-                        if ti not in lrc_list:
-                            lrc_list.append(ti)
-                mle.lrc = lrc_list
+                with self.stage("arrange"):
+                    lines = get_lrc_root(doc.lines)
+                    for line in lines:
+                        line.root = line.root.replace("\u3000", " ").replace("　", " ").strip()
+                # 各类型的请求互不依赖，同时发出，结果分别写入LyricLine对应字段
+                funcs = {"hira": self.dsapi.get_hira, "roma": self.dsapi.get_roma, "chin": self.dsapi.get_trans}
+                if self.packer is not None:
+                    futures = {item: self.packer.submit(item, lines, in_path)
+                               for item in self.seq if item in funcs}
+                else:
+                    futures = {item: self.ds_pool.submit(funcs[item], lines, in_path)
+                               for item in self.seq if item in funcs}
+                with self.stage("deepseek"):
+                    results = {item: set(map(id, future.result())) for item, future in futures.items()}
+                flag = sum(len(res) != len(lines) for res in results.values())
+
+                # 所有类型都成功的行按seq顺序输出
+                seen = {(0, c) for c in doc.credits}
+                for line in lines:
+                    if not all(id(line) in res for res in results.values()):
+                        continue
+                    for item in self.seq:
+                        ti = (line.time, line.root if item == "kanji" else getattr(line, item))
+                        if ti not in seen:
+                            seen.add(ti)
+                            doc.output.append(ti)
+                mle.lrc = doc
                 out_path = path.splitext(path.join(self.lrc_backup, path.split(in_path)[1]))[0] + ".lrc"
-                with open(out_path, 'w+', encoding='utf-8') as f:
-                    f.writelines(lrc)
-                if mle.write_lyrics():
+                with self.stage("backup"):
+                    with open(out_path, 'w+', encoding='utf-8') as f:
+                        f.writelines(lrc)
+                with self.stage("write_tags"):
+                    written = mle.write_lyrics()
+                if written:
                     if flag:
                         self.logging.info(f"处理异常:歌词主体结构多次变动({flag}) {in_path}")
                         dire = "defect"
                     else:
                         self.logging.info(f"处理完成:{in_path}")
                         dire = "success"
-                    movefile(in_path, dire)
-                    return dire
+                    return self.finish(in_path, dire, doc.to_lines())
+                self.logging.error(f"写入歌词失败:{in_path}")
+                return self.finish(in_path, "error", move=False)
+
+
+def main(argv=None):
+    """命令行批量处理，每个文件的结果以JSON行输出到标准输出"""
+    parser = argparse.ArgumentParser(prog="JLTool", description="日语音乐歌词注音工具（命令行）")
+    parser.add_argument("paths", nargs="*", help="文件或文件夹路径")
+    parser.add_argument("--seq", default="", help="注音序列，如 chin-hira-kanji（默认读取config.json）")
+    parser.add_argument("--mode", choices=["kks", "ds"], default="kks", help="kks本地计算 / ds使用Deepseek")
+    parser.add_argument("--key", default="", help="Deepseek API密钥（默认读取config.json或DEEPSEEK_API_KEY）")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="并行数，0为CPU核心数")
+    parser.add_argument("--pack-tokens", type=int, default=0, help="DS模式合并请求的token预算，0为不合并")
+    parser.add_argument("--stream", action="store_true",
+                        help="DS模式使用流式返回，边接收边匹配，格式异常时提前中断重试（默认读取config.json的ds_stream）")
+    parser.add_argument("--resume", action="store_true", help="跳过运行记录中已以相同seq/mode完成的文件")
+    parser.add_argument("--list", metavar="FILE", help="从文件列表读取路径（每行一个），可与paths同时使用")
+    parser.add_argument("--scan", action="store_true", help="只扫描分类，不注音、不移动文件")
+    parser.add_argument("--list-out", metavar="FILE", help="扫描模式下将日语同步歌词文件写入列表，供后续处理使用")
+    parser.add_argument("--index", action="store_true",
+                        help=f"使用音乐库索引({LIBRARY_INDEX})增量收集与扫描，只重新读取变化的文件，并记录处理结果")
+    parser.add_argument("--query", nargs="+", metavar="COND",
+                        help="查询音乐库索引并输出路径，如 result=defect、class=japanese seq!=chin")
+    parser.add_argument("--timing", action="store_true",
+                        help="记录每个文件各阶段的耗时，报告写入logs目录（与日志同名的.timing.json/.timing.csv）")
+    parser.add_argument("--profile-top", type=int, default=0, metavar="N",
+                        help="对每个文件做cProfile，保存最慢N个文件的统计（隐含--timing）")
+    args = parser.parse_args(argv)
+    if args.query:
+        return query_main(args.query, args.list_out)
+    paths = args.paths + (read_list(args.list) if args.list else [])
+    if not paths:
+        parser.error("需要至少一个路径或 --list")
+
+    config = {}
+    if path.exists("config.json"):
+        with open("config.json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+    seq = args.seq or config.get("seq") or "chin-hira-kanji"
+    ds_key = ""
+    if args.mode == "ds" and not args.scan:
+        ds_key = args.key or environ.get("DEEPSEEK_API_KEY") or config.get("ds_key", "")
+        if not ds_key:
+            parser.error("ds模式需要Deepseek API密钥")
+
+    # 日志输出到标准错误与logs目录，标准输出只保留结果
+    if not path.exists("logs"):
+        makedirs("logs")
+    log_file = path.join("logs", datetime.now().strftime("%Y%m%d_%H%M%S") + ".log")
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%H:%M:%S'))
+    logging.basicConfig(level=logging.INFO, handlers=[stream_handler, file_handler])
+
+    # 各模块的print诊断信息转到标准错误，标准输出只保留JSON结果
+    out = sys.stdout
+    with redirect_stdout(sys.stderr):
+        index = LibraryIndex(LIBRARY_INDEX) if args.index else None
+        files = index.walk(paths) if index else collect_all_files(paths)
+        workers = args.workers or cpu_count() or 1
+        if args.scan:
+            return scan_main(files, workers if workers > 1 else SCAN_WORKERS, args.list_out, index, out)
+        jlmain = JLToolMain(seq, logging, ds_key, workers=workers,
+                            pack_tokens=args.pack_tokens, journal=RUN_JOURNAL,
+                            index=LIBRARY_INDEX if args.index else "",
+                            progress=ProgressStats(),
+                            timer=StageTimer(args.profile_top) if args.timing or args.profile_top else None,
+                            stream=args.stream or config.get("ds_stream", False))
+        if args.resume:
+            files = jlmain.pending(files)
+        jlmain.progress.reset(len(files))
+        logging.info(f"开始批量处理 {len(files)} 个文件, 序列配置: {seq}, 模式: {args.mode}")
+        counts = {}
+        try:
+            for in_path, result in jlmain.start_pool(files):
+                counts[result] = counts.get(result, 0) + 1
+                emit(out, in_path, result)
+        finally:
+            jlmain.close()
+            if jlmain.timer is not None:
+                logging.info("分阶段耗时(ms):\n" + jlmain.timer.format_summary())
+                for saved in jlmain.timer.save(path.splitext(log_file)[0]):
+                    logging.info(f"已写入: {saved}")
+        logging.info(f"批量处理完成: {json.dumps(counts, ensure_ascii=False)}")
+        logging.info(jlmain.progress.summary())
+        return 1 if counts.get("error") else 0
+
+
+def emit(out, in_path, result):
+    """向标准输出写入一个文件的结果（JSON行）"""
+    print(json.dumps({"path": in_path, "result": result}, ensure_ascii=False), file=out, flush=True)
+
+
+def scan_main(files, workers, list_out="", index=None, out=None):
+    """扫描模式：逐文件输出分类，可处理的文件写入列表；给出index时增量扫描并更新索引"""
+    logging.info(f"开始扫描 {len(files)} 个文件, 线程数: {workers}")
+    counts = {}
+    japanese = []
+    results = index.scan(files, workers) if index else scan_files(files, workers)
+    for in_path, result in results:
+        counts[result] = counts.get(result, 0) + 1
+        if result == "japanese":
+            japanese.append(in_path)
+        emit(out or sys.stdout, in_path, result)
+    if list_out:
+        write_list(list_out, japanese)
+        logging.info(f"已写入文件列表: {list_out}（{len(japanese)} 个文件）")
+    logging.info(f"扫描完成: {json.dumps(counts, ensure_ascii=False)}")
+    if index:
+        index.close()
+    return 0
+
+
+def query_main(conditions, list_out=""):
+    """查询音乐库索引，每行输出一个路径"""
+    index = LibraryIndex(LIBRARY_INDEX)
+    try:
+        files = index.query(conditions)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        index.close()
+    for file in files:
+        print(file, flush=True)
+    if list_out:
+        write_list(list_out, files)
+    return 0
 
 
 if __name__ == "__main__":
-    ...
+    multiprocessing.freeze_support()  # pyinstaller打包后，进程池子进程不重新启动整个程序
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+注音对齐：金标准语料校验 + 与旧版逐格DP的耗时对比
+
+用法（在项目根目录）:
+    python -m bench.bench_align            校验并计时
+    python -m bench.bench_align --update   用旧实现重新生成金标准语料
+"""
+import json
+import random
+import sys
+from os import path
+from time import perf_counter
+
+from tools.align import align_strings
+
+GOLDEN = path.join(path.dirname(__file__), "align_golden.json")
+
+PAIRS = [
+    ("君の名前は何ですか", "きみのなまえはなんですか"),
+    ("歩き出そう dreaming way", "あるきだそうdreamingway"),
+    ("始まったばかりの夢から射す光", "はじまったばかりのゆめからさすひかり"),
+    ("トキめくよ dreaming light", "ときめくよdreaminglight"),
+    ("今百年戦争の真ん中で", "いまひゃくねんせんそうのまんなかで"),
+    ("星空の下で二人は出会った", "ほしぞらのしたでふたりはであった"),
+    ("忘れられない夏の日の記憶", "わすれられないなつのひのきおく"),
+    ("明日へ向かって走り出す", "あしたへむかってはしりだす"),
+    ("心の奥に眠る願い", "こころのおくにねむるねがい"),
+    ("遠く離れても 君を想う", "とおくはなれてもきみをおもう"),
+    ("Ready to fly（一！二！三！四！）", "Readytofly（いち！に！さん！よん！）"),
+    ("イジワルしたい", "いじわるしたい"),
+    ("コントロールしなきゃ", "こんとろーるしなきゃ"),
+    ("ヤバイヤダしならららる", "やばいやだしならららる"),
+    ("桜舞い散る季節に", "さくらまいちるきせつに"),
+    ("永遠に続く物語", "えいえんにつづくものがたり"),
+    ("涙の数だけ強くなれるよ", "なみだのかずだけつよくなれるよ"),
+    ("世界中の誰よりきっと", "せかいじゅうのだれよりきっと"),
+    ("微笑みの爆弾", "ほほえみのばくだん"),
+    ("一期一会", "いちごいちえ"),
+    ("", ""),
+    ("漢字", ""),
+    ("", "かな"),
+    ("あいう", "あいう"),
+]
+
+
+def legacy_align(str1, str2):
+    """改动前LyrTrans.align_strings的逐格DP实现"""
+    _m = len(str1)
+    _n = len(str2)
+    dp = [[0] * (_n + 1) for _ in range(_m + 1)]
+    for _i in range(_m + 1):
+        for _j in range(_n + 1):
+            if _i == 0 or _j == 0:
+                dp[_i][_j] = _i + _j
+            elif str1[_i - 1] == str2[_j - 1]:
+                dp[_i][_j] = dp[_i - 1][_j - 1]
+            else:
+                dp[_i][_j] = 1 + min(dp[_i - 1][_j], dp[_i][_j - 1])
+    _i, _j = _m, _n
+    align1 = []
+    _kanji = False
+    while _i > 0 or _j > 0:
+        if _i > 0 and _j > 0 and str1[_i - 1] == str2[_j - 1]:
+            align1.append(str1[_i - 1])
+            _i -= 1
+            _j -= 1
+        elif _i > 0 and (_j == 0 or dp[_i - 1][_j] < dp[_i][_j - 1]):
+            if _kanji:
+                align1.append("[")
+                _kanji = False
+            _i -= 1
+        else:
+            if _kanji:
+                align1.append(str2[_j - 1])
+            else:
+                _kanji = True
+                align1.append(str2[_j - 1] + "]")
+            _j -= 1
+    return ''.join(reversed(align1))
+
+
+def corpus():
+    """固定的歌词样例 + 固定种子生成的随机样例"""
+    pairs = list(PAIRS)
+    rng = random.Random(20240101)
+    alphabet = "あいうかきの光夢君名前abc ！"
+    for _ in range(300):
+        pairs.append(("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))),
+                      "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))))
+    return pairs
+
+
+def update():
+    golden = [[s1, s2, legacy_align(s1, s2)] for s1, s2 in corpus()]
+    with open(GOLDEN, "w", encoding="utf-8") as f:
+        json.dump(golden, f, ensure_ascii=False, indent=0)
+    print(f"已写入 {len(golden)} 条金标准: {GOLDEN}")
+
+
+def check():
+    with open(GOLDEN, encoding="utf-8") as f:
+        golden = json.load(f)
+    bad = [(s1, s2, exp, align_strings(s1, s2)) for s1, s2, exp in golden
+           if align_strings(s1, s2) != exp]
+    for item in bad:
+        print("不一致:", item)
+    print(f"金标准校验: {len(golden) - len(bad)}/{len(golden)} 一致")
+    return not bad
+
+
+def timing(repeat=20):
+    for times in (1, 4, 16):
+        s1 = "".join(p[0] for p in PAIRS[:10]) * times
+        s2 = "".join(p[1] for p in PAIRS[:10]) * times
+        t0 = perf_counter()
+        for _ in range(repeat):
+            legacy_align(s1, s2)
+        t_old = (perf_counter() - t0) / repeat
+        t0 = perf_counter()
+        for _ in range(repeat):
+            align_strings(s1, s2)
+        t_new = (perf_counter() - t0) / repeat
+        print(f"长度 {len(s1):5d}/{len(s2):5d}  旧: {t_old * 1e3:9.2f} ms  "
+              f"新: {t_new * 1e3:7.2f} ms  ({t_old / t_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        update()
+    else:
+        ok = check()
+        timing()
+        sys.exit(0 if ok else 1)
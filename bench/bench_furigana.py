@@ -0,0 +1,89 @@
+"""
+注音耗时对比：每次调用新建MeCab.Tagger（旧实现） vs 常驻Furigana批量解析
+
+"互不相同"用合成的不重复歌词行测逐行注音耗时；"重复行"循环使用少量固定句子，
+另外计入readings()对重复行只解析一次的收益。
+
+用法（在项目根目录）:
+    python -m bench.bench_furigana [行数]
+"""
+import random
+import sys
+from time import perf_counter
+
+import MeCab
+
+from bench.synthetic import ja_line
+from tools.lrc import Furigana, get_kks, katakana_to_hiragana
+
+LINES = [
+    "君の名前は何ですか",
+    "歩き出そう dreaming way",
+    "始まったばかりの夢から射す光",
+    "トキめくよ dreaming light",
+    "今百年戦争の真ん中で",
+    "なれないから",
+    "星空の下で二人は出会った",
+    "忘れられない夏の日の記憶",
+]
+
+
+def legacy_furigana(text):
+    """改动前的add_furigana：每次调用都重新加载词典"""
+    tagger = MeCab.Tagger()
+    node = tagger.parseToNode(text)
+    result = []
+    while node:
+        surface = node.surface
+        if surface:
+            _line = ""
+            for item in get_kks().convert(surface):
+                _line += item["hira"]
+            if _line == surface:
+                result.append(surface)
+            else:
+                feature_parts = node.feature.split(',')
+                if len(feature_parts) > 7 and feature_parts[6] and feature_parts[6] != '*':
+                    result.append(katakana_to_hiragana(feature_parts[6]))
+                else:
+                    result.append(surface)
+        node = node.next
+    return ''.join(result)
+
+
+def distinct_lines(num, seed=0):
+    """num行互不相同的合成日语歌词"""
+    rng = random.Random(seed)
+    lines = {}
+    while len(lines) < num:
+        lines.setdefault(ja_line(rng), None)
+    return list(lines)
+
+
+def compare(name, lines):
+    num = len(lines)
+    t0 = perf_counter()
+    old = [legacy_furigana(line) for line in lines]
+    t_old = perf_counter() - t0
+
+    furigana = Furigana()
+    t0 = perf_counter()
+    new = furigana.readings(lines)
+    t_new = perf_counter() - t0
+
+    assert old == new, f"{name}: 注音结果与旧实现不一致"
+    print(f"{name}（{num} 行，不同 {len(set(lines))} 行）")
+    print(f"  旧实现: {t_old / num * 1e6:10.1f} us/行")
+    print(f"  Furigana.readings: {t_new / num * 1e6:10.1f} us/行  ({t_old / t_new:.1f}x)")
+
+
+def main(num=400):
+    # 预先加载词典，避免首个用例计入一次性的加载耗时
+    legacy_furigana(LINES[0])
+    Furigana().reading(LINES[0])
+    compare("互不相同", distinct_lines(num))
+    compare("重复行", [LINES[i % len(LINES)] for i in range(num)])
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+启动耗时测试：解析 python -X importtime 输出，检查入口模块的导入耗时
+并确认pykakasi、MeCab、OpenCC、langid、openai等重依赖没有在导入时加载
+
+用法（在项目根目录）:
+    python -m bench.bench_import [模块名...]
+"""
+import subprocess
+import sys
+
+HEAVY = ("pykakasi", "MeCab", "opencc", "langid", "openai", "numpy")
+LIMIT_MS = 300  # 单个入口模块导入耗时上限
+
+
+def importtime(module):
+    """在新进程中导入模块，返回 {模块名: 累计耗时(微秒)}"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # 表头
+    return times
+
+
+def main(*modules):
+    ok = True
+    for module in modules or ("JLTool", "tools.lrc", "tools.dsapi"):
+        times = importtime(module)
+        total = times[module] / 1000
+        heavy = sorted({name.split(".")[0] for name in times} & set(HEAVY))
+        print(f"{module:12s} {total:8.1f} ms  重依赖: {', '.join(heavy) or '无'}")
+        for name, cost in sorted(times.items(), key=lambda x: -x[1])[1:6]:
+            print(f"    {name:30s} {cost / 1000:8.1f} ms")
+        if heavy or total > LIMIT_MS:
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*sys.argv[1:]) else 1)
@@ -0,0 +1,43 @@
+"""
+语言识别对比：逐行 langid.classify（全部语言） vs 限定语言的批量 classify_langs
+
+用法（在项目根目录）:
+    python -m bench.bench_langid [行数...]
+"""
+import random
+import sys
+from time import perf_counter
+
+import langid
+
+from tools.lrc import classify_langs, get_identifier
+
+WORDS = ["我们", "的爱", "天空", "好想", "下雨", "今天", "明天", "再见", "永远", "梦想", "心跳",
+         "夜空", "星星", "歌声", "回忆", "未来", "一起", "走吧", "为了", "你"]
+
+
+def make_lines(num, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(WORDS, k=rng.randint(2, 6))) for _ in range(num)]
+
+
+def main(*sizes):
+    t0 = perf_counter()
+    get_identifier()
+    langid.classify("")
+    print(f"加载模型: {(perf_counter() - t0) * 1e3:.1f} ms（两个识别器）")
+    for num in sizes or (20, 200, 2000):
+        lines = make_lines(num)
+        t0 = perf_counter()
+        old = {line: langid.classify(line) for line in lines}
+        t_old = perf_counter() - t0
+        t0 = perf_counter()
+        new = classify_langs(lines)
+        t_new = perf_counter() - t0
+        # 整理歌词时只关心是否识别为中文及中文得分
+        diff = sum((old[line][0] == "zh") != (new[line][0] == "zh") for line in lines)
+        print(f"{num:6d} 行  逐行: {t_old * 1e3:8.1f} ms  批量: {t_new * 1e3:7.2f} ms  中文判定不同: {diff}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,93 @@
+"""
+返回句对匹配：旧版逐行 stringsim 扫描 vs PairMatcher 哈希索引，并校验结果一致
+
+用法（在项目根目录）:
+    python -m bench.bench_match [行数...]
+"""
+import random
+import sys
+from time import perf_counter
+
+from bench.synthetic import ja_line
+from tools.dsapi import DSAPI, norstring, spstring, stringsim
+from tools.lyric import LyricLine
+
+
+def legacy_match(kind, lines, lis):
+    """改动前DSAPI.match_pairs的实现"""
+    output, dedu = [], []
+    for item in lines:
+        for i, o in lis:
+            if stringsim(item.root, i):
+                if kind != "hira":
+                    setattr(item, kind, o)
+                elif i == o:
+                    item.hira = i
+                else:
+                    item.hira = DSAPI.align_strings(i, o)
+                output.append(item)
+                break
+        else:
+            string = ""
+            numlist = []
+            tem = spstring(item.root)
+            for n, (i, o) in enumerate(lis):
+                s1 = spstring(i)
+                if s1 in tem:
+                    numlist.append(n)
+                    string += s1
+            if string == tem:
+                s1, s2 = "", ""
+                for n in numlist:
+                    s1 += lis[n][0]
+                    s2 += lis[n][1]
+                if kind != "hira":
+                    setattr(item, kind, s2)
+                else:
+                    s1, s2 = norstring(s1), norstring(s2)
+                    if s1 == s2:
+                        item.hira = s1
+                    else:
+                        item.hira = DSAPI.align_strings(s1, s2)
+                output.append(item)
+            else:
+                dedu.append(item)
+    return output, dedu
+
+
+def make_case(num, seed=0):
+    """num行主干句与模拟返回：多数原样返回，少量被拆分、加标点或缺失"""
+    rng = random.Random(seed)
+    roots = [ja_line(rng) for _ in range(num)]
+    lis = []
+    for root in roots:
+        c = rng.random()
+        if c < 0.85:
+            lis.append([root, "译" + root])
+        elif c < 0.92:
+            lis.append([root + "、", "译" + root])
+        elif c < 0.97 and len(root) > 3:
+            k = len(root) // 2
+            lis += [[root[:k], "前" + root[:k]], [root[k:], "后" + root[k:]]]
+    return roots, lis
+
+
+def main(*sizes):
+    for num in sizes or (50, 200, 1000):
+        roots, lis = make_case(num)
+        old_lines = [LyricLine(n, (root,), root=root) for n, root in enumerate(roots)]
+        new_lines = [LyricLine(n, (root,), root=root) for n, root in enumerate(roots)]
+        t0 = perf_counter()
+        old = legacy_match("chin", old_lines, lis)
+        t_old = perf_counter() - t0
+        t0 = perf_counter()
+        new = DSAPI.match_pairs("chin", new_lines, lis)
+        t_new = perf_counter() - t0
+        same = ([line.time for line in old[1]] == [line.time for line in new[1]]
+                and [line.chin for line in old_lines] == [line.chin for line in new_lines])
+        print(f"{num:6d} 行  旧: {t_old * 1e3:9.2f} ms  索引: {t_new * 1e3:8.2f} ms  "
+              f"未匹配: {len(new[1])}  结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
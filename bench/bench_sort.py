@@ -0,0 +1,69 @@
+"""
+分组/去重的规模测试：lrc_sort、listsort 与旧版双重循环实现对比
+
+用法（在项目根目录）:
+    python -m bench.bench_sort [行数...]
+"""
+import random
+import sys
+from time import perf_counter
+
+from tools.lrc import lrc_sort, listsort
+
+
+def legacy_lrc_sort(lrc_list):
+    times, _ = zip(*lrc_list)
+    times = list(dict.fromkeys(times))
+    nl = []
+    for time in times:
+        for t, l in lrc_list:
+            if time == t and [t, l] not in nl:
+                nl += [[t, l]]
+    return nl
+
+
+def legacy_listsort(lrc_list):
+    times = list(zip(*lrc_list))[0]
+    times = list(dict.fromkeys(times))
+    nl = []
+    for time in times:
+        for item in lrc_list:
+            if time == item[0]:
+                nl.append(item)
+    return nl
+
+
+def make_lines(num, seed=0):
+    """多语言LRC：每个时间戳约3行（原文/翻译/注音），含重复行与乱序"""
+    rng = random.Random(seed)
+    lines = []
+    for n in range(num // 3):
+        t = f"{n // 60:02d}:{n % 60:02d}.{rng.randint(0, 999):03d}"
+        for kind in ("ja", "zh", "hira"):
+            lines.append((t, f"{kind}-{rng.randint(0, num // 10)}"))
+    rng.shuffle(lines)
+    return lines[:num]
+
+
+def timeit(func, *args):
+    t0 = perf_counter()
+    res = func(*args)
+    return res, perf_counter() - t0
+
+
+def main(*sizes):
+    for num in sizes or (1000, 3000, 10000):
+        lines = make_lines(num)
+        rows = [[t, l, l + "x"] for t, l in lines]
+        new, t_new = timeit(lrc_sort, lines)
+        old, t_old = timeit(legacy_lrc_sort, lines)
+        assert new == old, "lrc_sort结果与旧实现不一致"
+        print(f"lrc_sort  {num:6d} 行  旧: {t_old * 1e3:10.1f} ms  新: {t_new * 1e3:7.2f} ms")
+        new, t_new = timeit(listsort, rows)
+        old, t_old = timeit(legacy_listsort, rows)
+        assert new == old, "listsort结果与旧实现不一致"
+        print(f"listsort  {num:6d} 行  旧: {t_old * 1e3:10.1f} ms  新: {t_new * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
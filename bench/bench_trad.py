@@ -0,0 +1,82 @@
+"""
+繁体检测对比：字符集合扫描（checktrad）与逐行OpenCC转换比较
+
+用法（在项目根目录）:
+    python -m bench.bench_trad [歌词文件或目录...]
+不指定路径时使用随机生成的简繁日混合语料；另外逐条校验已安装OpenCC词组表中的全部词条。
+"""
+import random
+import sys
+from time import perf_counter
+
+import opencc
+
+from tools.file import MusicLrcEditor, collect_all_files
+from tools.lrc import checktrad, get_t2s, get_trad_chars, get_phrase_chars, _t2s_phrase_keys
+from tools.lyric import LyricDocument
+
+SAMPLES = ["夢の中へ", "歩き出そう", "君の聲が聞こえる", "我們的愛", "我们的爱", "天空好想下雨",
+           "還是會想起你", "戦争と平和", "憂鬱な午後", "后来", "後來", "頭髮", "发展", "著作",
+           "一隻鳥", "風吹過", "心の奥", "夜明け前", "願い事", "笑顔で", "歌声", "遠い空"]
+# 词组转换与逐字转换结果不同的例子，少量混入
+PHRASES = ["瞭解", "乾隆", "沈默", "藉口", "為什麼", "乾杯"]
+
+
+def legacy_checktrad(text):
+    return get_t2s().convert(text) != text
+
+
+def make_corpus(num, seed=0):
+    rng = random.Random(seed)
+    texts = ["".join(rng.sample(SAMPLES, rng.randint(1, 3))) for _ in range(num)]
+    for n in range(0, num, 50):
+        texts[n] += rng.choice(PHRASES)
+    return texts
+
+
+def phrase_corpus():
+    """词组表中的每个词条，单独及前后接上其他字各一次"""
+    keys = _t2s_phrase_keys() or []
+    return keys + [f"的{key}了" for key in keys]
+
+
+def load_corpus(paths):
+    texts = []
+    for file in collect_all_files(paths):
+        lines = MusicLrcEditor(file).read_lyrics()
+        if lines:
+            texts += LyricDocument.parse(lines).texts()
+    return texts
+
+
+def compare(name, texts):
+    t0 = perf_counter()
+    old = [legacy_checktrad(text) for text in texts]
+    t_old = perf_counter() - t0
+    t0 = perf_counter()
+    new = [checktrad(text) for text in texts]
+    t_new = perf_counter() - t0
+    diff = [text for text, a, b in zip(texts, old, new) if a != b]
+    print(f"{name}: {len(texts)} 行  转换: {t_old * 1e3:.1f} ms  集合: {t_new * 1e3:.1f} ms  不一致: {len(diff)}")
+    for text in diff[:20]:
+        print("  ", text)
+    return diff
+
+
+def main(*paths):
+    t0 = perf_counter()
+    get_trad_chars()
+    phrase_chars = get_phrase_chars()
+    print(f"生成字符集合: {(perf_counter() - t0) * 1e3:.1f} ms  共 {len(get_trad_chars())} 字  "
+          f"词组相关字: {len(phrase_chars) if phrase_chars is not None else '无法读取词组表'}")
+    t0 = perf_counter()
+    for _ in range(100):
+        opencc.OpenCC('t2s')
+    print(f"每次新建转换器（旧实现的单次开销）: {(perf_counter() - t0) * 10:.2f} ms")
+    diff = compare("歌词" if paths else "合成语料", load_corpus(paths) if paths else make_corpus(20000))
+    diff += compare("词组表", phrase_corpus())
+    return not diff
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(*sys.argv[1:]) else 1)
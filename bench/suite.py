@@ -0,0 +1,176 @@
+"""
+歌词处理热点的基准测试套件，结果保存为JSON以便在不同提交之间对比
+
+输入由 bench.synthetic 确定性生成，每个用例在计时区外准备全新的对象
+（新的LyricLine、无持久缓存的LyrTrans，并清空script_profile缓存），
+计时结果均为冷缓存下的耗时。
+
+用法（在项目根目录）:
+    python -m bench.suite                              默认规模 100 1000 5000
+    python -m bench.suite --sizes 100 1000 --repeat 5
+    python -m bench.suite --only arrangelines trans_hira
+    python -m bench.suite --compare 旧.json 新.json
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from os import path, makedirs
+from statistics import median
+from time import perf_counter
+
+from bench.synthetic import make_lrc
+from tools.lrc import (LyrTrans, lrc_split, get_lrc_root, arrangelines, check_jap, lrc_sort, listsort,
+                       script_profile, warmup)
+from tools.lyric import LyricDocument
+
+RESULTS = path.join(path.dirname(__file__), "results")
+
+
+def fresh_lines(lrc):
+    script_profile.cache_clear()
+    return LyricDocument.parse(lrc).lines
+
+
+def fresh_roots(lrc):
+    lines = fresh_lines(lrc)
+    return [line.root for line in arrangelines(lines)]
+
+
+def prepare_trans(lrc):
+    return LyrTrans(""), fresh_roots(lrc)
+
+
+def prepare_align(lrc):
+    trans = LyrTrans("")
+    roots = fresh_roots(lrc)
+    return list(zip(roots, trans.furigana.readings(roots)))
+
+
+def prepare_jltool(lrc, tmp):
+    from JLTool import JLToolMain
+    jl = JLToolMain("kanji-hira-chin-roma", logging.getLogger("bench"), lrc_backup=tmp)
+    jl.kks = LyrTrans("")
+    return jl, fresh_lines(lrc)
+
+
+def prepare_pairs(lrc):
+    _, nlist, _ = lrc_split(lrc)
+    # 重复一遍并打乱组间顺序，让分组/去重有事可做
+    return nlist + nlist[::-1]
+
+
+# 用例名: (准备函数(lrc, 临时目录) -> 参数, 计时函数(参数))
+CASES = {
+    "lrc_split": (lambda lrc, tmp: lrc, lrc_split),
+    "check_jap": (lambda lrc, tmp: (script_profile.cache_clear(), LyricDocument.parse(lrc).texts())[1],
+                  check_jap),
+    "get_lrc_root": (lambda lrc, tmp: fresh_lines(lrc), get_lrc_root),
+    "arrangelines": (lambda lrc, tmp: fresh_lines(lrc), arrangelines),
+    "trans_hira": (lambda lrc, tmp: prepare_trans(lrc),
+                   lambda args: [args[0].trans(root, "hira") for root in args[1]]),
+    "trans_roma": (lambda lrc, tmp: prepare_trans(lrc),
+                   lambda args: [args[0].trans(root, "roma") for root in args[1]]),
+    "align_strings": (lambda lrc, tmp: prepare_align(lrc),
+                      lambda pairs: [LyrTrans.align_strings(text, res) for text, res in pairs]),
+    "lrc_sort": (lambda lrc, tmp: prepare_pairs(lrc), lrc_sort),
+    "listsort": (lambda lrc, tmp: prepare_pairs(lrc), listsort),
+    "lrclines_trans": (prepare_jltool, lambda args: args[0].lrclines_trans(args[1])),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=path.dirname(path.dirname(path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_case(name, size, repeat, tmp):
+    prepare, func = CASES[name]
+    lrc = make_lrc(size, seed=size)
+    times = []
+    for _ in range(repeat):
+        args = prepare(lrc, tmp)
+        t0 = perf_counter()
+        func(args)
+        times.append(perf_counter() - t0)
+    return {"case": name, "size": size, "lines": len(lrc), "repeat": repeat,
+            "min_ms": min(times) * 1e3, "median_ms": median(times) * 1e3}
+
+
+def run(sizes, repeat, only=None):
+    logging.disable(logging.INFO)
+    t0 = perf_counter()
+    warmup()
+    print(f"预加载: {(perf_counter() - t0) * 1e3:.0f} ms")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in only or CASES:
+            for size in sizes:
+                res = run_case(name, size, repeat, tmp)
+                results.append(res)
+                print(f"{name:16s} {size:6d} 组 {res['lines']:7d} 行  "
+                      f"min: {res['min_ms']:10.2f} ms  median: {res['median_ms']:10.2f} ms")
+    return {"meta": {"commit": git_commit(), "python": platform.python_version(),
+                     "platform": platform.platform(), "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                     "sizes": list(sizes), "repeat": repeat},
+            "results": results}
+
+
+def save(report, out=""):
+    if not out:
+        name = datetime.now().strftime("%Y%m%d-%H%M%S")
+        if report["meta"]["commit"]:
+            name += "-" + report["meta"]["commit"]
+        out = path.join(RESULTS, name + ".json")
+    _dir = path.dirname(out)
+    if _dir and not path.exists(_dir):
+        makedirs(_dir, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return out
+
+
+def compare(old_path, new_path):
+    """按 (用例, 规模) 对比两次结果的中位数，比值<1为变快"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"旧: {old['meta']['commit'] or old_path} ({old['meta']['time']})")
+    print(f"新: {new['meta']['commit'] or new_path} ({new['meta']['time']})")
+    base = {(res["case"], res["size"]): res for res in old["results"]}
+    for res in new["results"]:
+        prev = base.get((res["case"], res["size"]))
+        if prev is None:
+            print(f"{res['case']:16s} {res['size']:6d}  {'':>12s}  {res['median_ms']:10.2f} ms")
+            continue
+        ratio = res["median_ms"] / prev["median_ms"] if prev["median_ms"] else float("inf")
+        print(f"{res['case']:16s} {res['size']:6d}  {prev['median_ms']:10.2f} ms  "
+              f"{res['median_ms']:10.2f} ms  x{ratio:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="歌词处理基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="每首合成歌词的时间戳数")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数，取最小值与中位数")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="只运行指定用例")
+    parser.add_argument("--out", default="", help="结果JSON路径，默认 bench/results/<时间>-<提交>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两个结果JSON")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    report = run(args.sizes, max(args.repeat, 1), args.only)
+    print(f"结果已保存: {save(report, args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
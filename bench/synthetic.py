@@ -0,0 +1,81 @@
+"""
+确定性的多语言LRC生成器：日语原文、中文翻译（简/繁）、假名注音与罗马音行
+
+供 bench.suite 及各专项测试共用，相同参数总是生成相同内容。
+"""
+import random
+from os import path, makedirs
+
+# 日语句子至少包含一个汉字词与一个假名词，分类时归为原文
+JA_KANJI = ["君", "名前", "夢", "光", "星空", "二人", "夏", "記憶", "明日", "心", "願い", "桜", "季節",
+            "涙", "世界中", "誰", "物語", "永遠", "空", "約束", "笑顔", "未来", "花", "風", "声"]
+JA_KANA = ["の", "は", "から", "で", "へ", "に", "を", "だけ", "より", "きっと", "よ", "ね", "トキめく",
+           "イジワル", "したい", "コントロール", "しなきゃ", "歩き出そう", "出会った", "忘れられない",
+           "向かって", "走り出す", "眠る", "離れても", "想う", "舞い散る", "強く", "なれる"]
+JA_EN = ["dreaming", "way", "light", "ready", "fly", "love", "forever", "yeah"]
+ZH_WORDS = ["你", "的", "名字", "梦", "光", "星空", "下", "我们", "相遇", "夏天", "记忆", "明天", "奔跑",
+            "心", "愿望", "遥远", "想念", "樱花", "季节", "眼泪", "世界", "一定", "坚强", "约定", "未来"]
+ZH_TRAD_WORDS = ["這", "是", "夢", "裡", "的", "聲音", "記憶", "遠方", "淚水", "願望", "櫻花", "愛", "說"]
+HIRA_WORDS = ["きみ", "の", "なまえ", "ゆめ", "から", "ひかり", "ほしぞら", "ふたり", "なつ", "あした",
+              "こころ", "ねがい", "さくら", "なみだ", "せかい", "きっと", "よ"]
+ROMA_WORDS = ["kimi", "no", "namae", "yume", "kara", "hikari", "hoshizora", "futari", "natsu", "ashita",
+              "kokoro", "negai", "sakura", "namida", "sekai", "kitto", "yo"]
+
+
+def ja_line(rng):
+    words = rng.choices(JA_KANJI, k=rng.randint(1, 3)) + rng.choices(JA_KANA, k=rng.randint(1, 4))
+    rng.shuffle(words)
+    if rng.random() < 0.15:
+        words.append(" " + rng.choice(JA_EN))
+    return "".join(words)
+
+
+def zh_line(rng):
+    pool = ZH_TRAD_WORDS if rng.random() < 0.1 else ZH_WORDS
+    return "".join(rng.choices(pool, k=rng.randint(2, 6)))
+
+
+def hira_line(rng):
+    return "".join(rng.choices(HIRA_WORDS, k=rng.randint(2, 6)))
+
+
+def roma_line(rng):
+    return " ".join(rng.choices(ROMA_WORDS, k=rng.randint(2, 6)))
+
+
+def make_lrc(num, seed=0) -> list:
+    """
+    生成num个时间戳的LRC行（read_lyrics的返回形式）
+
+    每个时间戳一行日语原文，约70%附中文翻译，约25%附假名注音，约25%附罗马音，
+    另有少量重复行、无时间戳行，以及副歌式的重复时间戳。
+    """
+    rng = random.Random(seed)
+    lines = ["[ti:Synthetic]", "[ar:Bench]", "[00:00.00]作词：某人", "无时间戳的一行"]
+    for n in range(num):
+        ms = 1000 + n * 2500 + rng.randint(0, 999)
+        tag = f"[{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000 // 10:02d}]"
+        group = [ja_line(rng)]
+        if rng.random() < 0.7:
+            group.append(zh_line(rng))
+        if rng.random() < 0.25:
+            group.append(hira_line(rng))
+        if rng.random() < 0.25:
+            group.append(roma_line(rng))
+        if rng.random() < 0.05:
+            group.append(group[0])
+        lines += [tag + text for text in group]
+    return lines
+
+
+def make_library(directory, files=40, lines=30, seed=0) -> list:
+    """在directory中生成files个.lrc文件，返回文件路径"""
+    if not path.exists(directory):
+        makedirs(directory)
+    paths = []
+    for n in range(files):
+        file = path.join(directory, f"{n}.lrc")
+        with open(file, "w", encoding="utf-8") as f:
+            f.write("\n".join(make_lrc(lines, seed * 100003 + n)))
+        paths.append(file)
+    return paths
@@ -0,0 +1,52 @@
+"""
+命令行入口的结果与退出码
+
+用法（在项目根目录）:
+    python -m unittest discover tests
+"""
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import JLTool
+from bench.synthetic import make_lrc
+from tools.file import MusicLrcEditor
+
+
+class WriteFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.lrc = os.path.join(self.tmp.name, "song.lrc")
+        with open(self.lrc, "w", encoding="utf-8") as f:
+            f.write("\n".join(make_lrc(10)))
+        self.handlers = logging.getLogger().handlers[:]
+
+    def tearDown(self):
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            if handler not in self.handlers:
+                root_logger.removeHandler(handler)
+                handler.close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_write_failure_is_error(self):
+        """写入歌词失败时结果为error、文件不移动，退出码为1"""
+        out = io.StringIO()
+        with mock.patch.object(MusicLrcEditor, "write_lyrics", return_value=False), redirect_stdout(out):
+            code = JLTool.main([self.lrc, "--mode", "kks", "-j", "1", "--seq", "hira-kanji"])
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(results, [{"path": self.lrc, "result": "error"}])
+        self.assertEqual(code, 1)
+        self.assertTrue(os.path.exists(self.lrc))
+
+
+if __name__ == "__main__":
+    unittest.main()
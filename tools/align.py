@@ -0,0 +1,61 @@
+def align_strings(str1: str, str2: str) -> str:
+    """
+    对齐原文与全假名读音，生成 "[读音]汉字" 形式的注音文本
+
+    与逐格填充的编辑距离矩阵结果完全一致：公共后缀直接保留，
+    其余部分用位并行LCS（Hyyrö）逐行计算，每行压缩为一个整数位向量，
+    回溯时由位向量的popcount还原所需的矩阵值。
+    """
+    # 公共后缀在回溯中总是按相同字符逐个保留，可直接剥离
+    _k = 0
+    _lim = min(len(str1), len(str2))
+    while _k < _lim and str1[-1 - _k] == str2[-1 - _k]:
+        _k += 1
+    suffix = ""
+    if _k:
+        suffix = str1[-_k:]
+        str1, str2 = str1[:-_k], str2[:-_k]
+
+    _m = len(str1)
+    _n = len(str2)
+    # 每个字符在str2中出现位置的位掩码
+    mask = (1 << _n) - 1
+    peq = {}
+    for _j, char in enumerate(str2):
+        peq[char] = peq.get(char, 0) | (1 << _j)
+    # rows[i] 中低j位里0的个数即 LCS(str1[:i], str2[:j])
+    rows = [mask]
+    _v = mask
+    for char in str1:
+        _u = _v & peq.get(char, 0)
+        _v = ((_v + _u) | (_v - _u)) & mask
+        rows.append(_v)
+
+    def lcs(_i, _j):
+        return _j - bin(rows[_i] & ((1 << _j) - 1)).count("1")
+
+    # 回溯找出对齐方式
+    # 编辑距离 dp[i][j] = i + j - 2 * LCS(i, j)，
+    # 故 dp[i-1][j] < dp[i][j-1] 等价于 LCS(i-1, j) > LCS(i, j-1)
+    _i, _j = _m, _n
+    align1 = []
+    _kanji = False
+    while _i > 0 or _j > 0:
+        if _i > 0 and _j > 0 and str1[_i - 1] == str2[_j - 1]:
+            align1.append(str1[_i - 1])
+            _i -= 1
+            _j -= 1
+        elif _i > 0 and (_j == 0 or lcs(_i - 1, _j) > lcs(_i, _j - 1)):
+            if _kanji:
+                align1.append("[")
+                _kanji = False
+            _i -= 1
+        else:
+            if _kanji:
+                align1.append(str2[_j - 1])
+            else:
+                _kanji = True
+                align1.append(str2[_j - 1] + "]")
+            _j -= 1
+
+    return ''.join(reversed(align1)) + suffix
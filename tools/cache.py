@@ -0,0 +1,219 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from os import path, makedirs, getpid
+from time import time
+
+
+class ProcessConnection:
+    """
+    按进程打开的SQLite连接（WAL模式）
+
+    fork后的子进程首次使用时会重新连接，不使用继承自父进程的连接；schema为建表语句，每次连接时执行。
+    """
+
+    def __init__(self, db_path, schema=()):
+        self.db_path = db_path
+        self.schema = schema
+        self._conn = None
+        self._pid = None
+
+    def get(self):
+        if self._conn is None or self._pid != getpid():
+            _dir = path.dirname(self.db_path)
+            if _dir and not path.exists(_dir):
+                makedirs(_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for sql in self.schema:
+                self._conn.execute(sql)
+            self._conn.commit()
+            self._pid = getpid()
+        return self._conn
+
+    def close(self):
+        """关闭本进程打开的连接，继承自父进程的连接只丢弃不关闭"""
+        if self._conn is not None and self._pid == getpid():
+            self._conn.close()
+        self._conn = None
+
+
+class ReadingCache:
+    """
+    注音结果缓存
+
+    以 (行文本, 注音类型, 分析器/词典版本) 为键，内存中按LRU淘汰，
+    可选SQLite持久化（WAL模式，多个工作进程可同时读取）。
+    """
+
+    def __init__(self, db_path="", version="", maxsize=50000, max_disk=1000000):
+        self.db_path = db_path
+        self.version = version
+        self.maxsize = maxsize
+        self.max_disk = max_disk
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0  # 上次裁剪后本进程写入的条数
+        self._mem = OrderedDict()
+        self._conn = ProcessConnection(db_path, (
+            "CREATE TABLE IF NOT EXISTS readings ("
+            "id INTEGER PRIMARY KEY, version TEXT, kind TEXT, text TEXT, value TEXT)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS readings_key ON readings (version, kind, text)",
+        )) if db_path else None
+
+    def _db(self):
+        return self._conn.get() if self._conn is not None else None
+
+    def _remember(self, key, value):
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        if len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def get_many(self, lines, kind) -> dict:
+        """批量查询，返回命中的 {行文本: 结果}"""
+        found = {}
+        missing = []
+        unique = list(dict.fromkeys(lines))
+        for line in unique:
+            key = (line, kind)
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                found[line] = self._mem[key]
+            else:
+                missing.append(line)
+        conn = self._db()
+        if conn is not None and missing:
+            for n in range(0, len(missing), 500):
+                part = missing[n:n + 500]
+                rows = conn.execute(
+                    f"SELECT text, value FROM readings WHERE version=? AND kind=? "
+                    f"AND text IN ({','.join('?' * len(part))})",
+                    [self.version, kind] + part).fetchall()
+                for text, value in rows:
+                    found[text] = value
+                    self._remember((text, kind), value)
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, items: dict, kind):
+        """批量写入 {行文本: 结果}"""
+        for line, value in items.items():
+            self._remember((line, kind), value)
+        conn = self._db()
+        if conn is not None and items:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO readings (version, kind, text, value) "
+                                 "VALUES (?, ?, ?, ?)",
+                                 [(self.version, kind, line, value) for line, value in items.items()])
+            # 进程池的工作进程不会调用close，写入一定数量后即裁剪，磁盘缓存超出上限不超过约10%
+            self._puts += len(items)
+            if self._puts >= max(1, self.max_disk // 10):
+                self._trim(conn)
+
+    def _trim(self, conn):
+        """按写入顺序淘汰超出磁盘上限的最早条目"""
+        with conn:
+            conn.execute("DELETE FROM readings WHERE id <= (SELECT MAX(id) FROM readings) - ?", (self.max_disk,))
+        self._puts = 0
+
+    def take_stats(self):
+        """取出并清零命中/未命中计数（用于汇总工作进程的统计）"""
+        stats = self.hits, self.misses
+        self.hits = self.misses = 0
+        return stats
+
+    def add_stats(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"注音缓存 命中:{self.hits} 未命中:{self.misses} 命中率:{rate:.1f}%"
+
+    def close(self):
+        """裁剪磁盘缓存到上限并关闭连接；主进程未使用过缓存时（如进程池模式）也会打开并裁剪"""
+        conn = self._db()
+        if conn is not None:
+            self._trim(conn)
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Deepseek返回内容缓存
+
+    以 (系统提示词, 用户提示词, 模型) 的哈希为键保存在SQLite中，
+    超过有效期的条目不再命中，总大小超过上限时淘汰最早写入的条目。
+    """
+
+    def __init__(self, db_path, ttl=30 * 24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        _dir = path.dirname(db_path)
+        if _dir and not path.exists(_dir):
+            makedirs(_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                           "key TEXT PRIMARY KEY, value TEXT, outpath TEXT, size INTEGER, created REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(system_prompt, user_prompt, model):
+        return hashlib.sha256(json.dumps([system_prompt, user_prompt, model],
+                                         ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """返回 (内容, 原始记录路径)，未命中返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT value, outpath FROM responses WHERE key=? AND created>=?",
+                                     (key, time() - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return row
+
+    def put(self, key, value, outpath=""):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                                   (key, value, outpath, len(value.encode("utf-8")), time()))
+            self._puts += 1
+            if self._puts % 100 == 1:
+                self._trim()
+
+    def delete(self, key):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+
+    def _trim(self):
+        """删除过期条目，并按写入时间从旧到新淘汰超出大小上限的部分"""
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created<?", (time() - self.ttl,))
+            self._conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM ("
+                               "SELECT key, SUM(size) OVER (ORDER BY created DESC) AS total "
+                               "FROM responses) WHERE total>?)", (self.max_bytes,))
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"Deepseek缓存 命中:{self.hits} 未命中:{self.misses} 命中率:{rate:.1f}%"
+
+    def close(self):
+        with self._lock:
+            self._trim()
+            self._conn.close()
@@ -1,57 +1,154 @@
 from os import path
 from time import sleep
-
-from openai import OpenAI
 from datetime import datetime
 import difflib
+import logging
 import re
+from tools.align import align_strings
+from tools.cache import ResponseCache
+
+STREAM_BAD_LINES = 5  # 流式返回中连续多少个非空行不符合 "输入句//转化句" 即视为模型未按格式输出
+
+
+class StreamAborted(Exception):
+    """流式返回格式异常或被截断，请求已提前中断"""
+
+
+# 片假名范围: 0x30A0-0x30FF
+# 平假名范围: 0x3040-0x309F
+# 片假名和平假名的Unicode码相差96(0x60)
+_KATA_TO_HIRA = {code: code - 0x60 for code in range(0x30A0, 0x3100)}
+_PUNCT = re.compile(r'[，。！？；：“”‘’（）【】＜＞「」、\.,!?;:"\'\(\)\[\]\{\}]')
+_SPACES = re.compile(r'\s+')
+_BRACKETS = re.compile(r'[(\[{（].*?[）)\]}]')
 
 
 def katakana_to_hiragana(text):
-    hiragana = []
-    for char in text:
-        code = ord(char)
-        # 片假名范围: 0x30A0-0x30FF
-        # 平假名范围: 0x3040-0x309F
-        if 0x30A0 <= code <= 0x30FF:
-            hiragana_char = chr(code - 0x60)  # 片假名和平假名的Unicode码相差96(0x60)
-            hiragana.append(hiragana_char)
-        else:
-            hiragana.append(char)
-    return ''.join(hiragana)
+    return text.translate(_KATA_TO_HIRA)
 
 
 def norstring(text):
-    punctuation_pattern = r'[，。！？；：“”‘’（）【】＜＞「」、\.,!?;:"\'\(\)\[\]\{\}]'
-    text = re.sub(punctuation_pattern, ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _PUNCT.sub(' ', text)
+    text = _SPACES.sub(' ', text).strip()
     return katakana_to_hiragana(text).lower()
 
 
 def spstring(text):
-    punctuation_pattern = r'[，。！？；：“”‘’（）【】＜＞「」、\.,!?;:"\'\(\)\[\]\{\}]'
-    text = re.sub(punctuation_pattern, '', text)
-    text = re.sub(r'\s+', '', text).strip()
+    text = _PUNCT.sub('', text)
+    text = _SPACES.sub('', text).strip()
     return katakana_to_hiragana(text).lower()
 
 
+def unbracket(text):
+    """去掉括号及其中的内容（如注释、和声）"""
+    return _BRACKETS.sub('', text)
+
+
 def stringsim(str1, str2):
     str1_norm = norstring(str1)
     str2_norm = norstring(str2)
     if str1_norm == str2_norm:
         return True
     else:
-        if re.sub(r'[(\[{（].*?[）)\]}]', '', str1) == str2:
+        if unbracket(str1) == str2:
             return True
         return False
 
 
+def parse_pair(line):
+    """解析一行 "输入句//转化句"，不符合格式时返回None"""
+    parts = line.replace("\u3000", " ").strip().split("//")
+    if len(parts) != 2:
+        return None
+    return [parts[0].strip(), parts[1].strip()]
+
+
+class PairMatcher:
+    """
+    将返回的句对按内容匹配回输入的LyricLine，结果写入与kind同名的字段
+
+    句对可逐个加入，流式返回时边接收边匹配、对齐；每行取最先匹配的句对。
+    输入行按 stringsim 的两种相等条件（规范化后相等 / 去括号后与返回句相同）
+    预先建立哈希索引，每个句对只需两次查找；
+    finish 时只对仍未匹配的行尝试拼接多个返回句（输入句被拆分的情况）。
+    """
+
+    def __init__(self, kind, lines):
+        self.kind = kind
+        self.lines = list(lines)
+        self.pairs = []
+        self.done = [False] * len(self.lines)
+        self._by_norm = {}  # norstring(主干句) -> 行序号
+        self._by_unbracket = {}  # unbracket(主干句) -> 行序号
+        for n, item in enumerate(self.lines):
+            self._by_norm.setdefault(norstring(item.root), []).append(n)
+            self._by_unbracket.setdefault(unbracket(item.root), []).append(n)
+
+    def add(self, i, o):
+        self.pairs.append((i, o))
+        # 同一键下的行都与该句对匹配，匹配后整组移出索引
+        for n in self._by_norm.pop(norstring(i), []) + self._by_unbracket.pop(i, []):
+            if not self.done[n]:
+                self.assign(self.lines[n], i, o)
+                self.done[n] = True
+
+    def assign(self, item, i, o):
+        if self.kind != "hira":
+            setattr(item, self.kind, o)
+        elif i == o:
+            item.hira = i
+        else:
+            item.hira = DSAPI.align_strings(i, o)
+
+    def finish(self):
+        """返回 (匹配成功的行, 未匹配的行)"""
+        output, dedu = [], []
+        sp = None  # 返回句的spstring，有未匹配的行时才计算
+        for item, done in zip(self.lines, self.done):
+            if done:
+                output.append(item)
+                continue
+            if sp is None:
+                sp = [spstring(i) for i, o in self.pairs]
+            # 输入句被拆分时，尝试拼接多个返回句
+            string = ""
+            numlist = []
+            tem = spstring(item.root)
+            for n, s1 in enumerate(sp):
+                if s1 in tem:
+                    numlist.append(n)
+                    string += s1
+            if string == tem:
+                s1, s2 = "", ""
+                for n in numlist:
+                    s1 += self.pairs[n][0]
+                    s2 += self.pairs[n][1]
+                if self.kind != "hira":
+                    setattr(item, self.kind, s2)
+                else:
+                    s1, s2 = norstring(s1), norstring(s2)
+                    if s1 == s2:
+                        item.hira = s1
+                    else:
+                        item.hira = DSAPI.align_strings(s1, s2)
+                output.append(item)
+            else:
+                dedu.append(item)
+        return output, dedu
+
+
 class DSAPI:
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache_path="cache/responses.db", stream=False):
+        from openai import OpenAI  # 仅AI模式需要，启动时不加载
         self.client = OpenAI(
             api_key=api_key,  #
             base_url="https://api.deepseek.com",
         )
+        self.model = "deepseek-chat"
+        # 流式返回：逐行解析并匹配，格式异常时提前中断以便尽快重试
+        self.stream = stream
+        # 相同提示词的返回直接复用，重试与重新处理不再重复请求
+        self.cache = ResponseCache(cache_path) if cache_path else None
         self.hira_prompt = r"""接下来给出一些歌词，将输入歌词中
             1、舍去中文句子
             2、舍去元信息句子
@@ -108,127 +205,213 @@ class DSAPI:
             なれないから//na re na i ka ra
             歩き出そう dreaming way//a ru ki da so u dreaming way
             dreaming way//dreaming way"""
+        self.prompts = {"hira": self.hira_prompt, "chin": self.trans_prompt, "roma": self.roma_prompt}
 
     @staticmethod
     def align_strings(str1, str2):
         _str = str(str1)
         str1 = katakana_to_hiragana(str1)
-        # 初始化矩阵
-        _m = len(str1)
-        _n = len(str2)
-        dp = [[0] * (_n + 1) for _ in range(_m + 1)]
-
-        # 填充矩阵
-        for _i in range(_m + 1):
-            for _j in range(_n + 1):
-                if _i == 0 or _j == 0:
-                    dp[_i][_j] = _i + _j
-                elif str1[_i - 1] == str2[_j - 1]:
-                    dp[_i][_j] = dp[_i - 1][_j - 1]
-                else:
-                    dp[_i][_j] = 1 + min(dp[_i - 1][_j], dp[_i][_j - 1])
-
-        # 回溯找出对齐方式
-        _i, _j = _m, _n
-        align1 = []
-        _kanji = False
-        while _i > 0 or _j > 0:
-            if _i > 0 and _j > 0 and str1[_i - 1] == str2[_j - 1]:
-                align1.append(str1[_i - 1])
-                _i -= 1
-                _j -= 1
-            elif _i > 0 and (_j == 0 or dp[_i - 1][_j] < dp[_i][_j - 1]):
-                if _kanji:
-                    align1.append("[")
-                    _kanji = False
-                _i -= 1
-            else:
-                if _kanji:
-                    align1.append(str2[_j - 1])
-                else:
-                    _kanji = True
-                    align1.append(str2[_j - 1] + "]")
-                _j -= 1
-        strin = ''.join(reversed(align1))
+        strin = align_strings(str1, str2)
         if strin == str1:
             return _str
         else:
             return strin
 
-    def get_dsres(self, _user_prompt, inpath, _system_prompt):
+    def get_dsres(self, _user_prompt, inpath, _system_prompt, reply=None):
+        """请求并返回 (内容, 原始记录路径)；给出reply字典时不直接写入缓存，
+        而是记录到reply中，由调用方确认句对可用后用settle写入"""
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(_system_prompt, _user_prompt, self.model)
+            if cached := self.cache.get(key):
+                if reply is not None:
+                    reply.update(key=key, content=cached[0], outpath=cached[1], cached=True)
+                return cached
         messages = [{"role": "system", "content": _system_prompt},
                     {"role": "user", "content": _user_prompt}]
 
         response = self.client.chat.completions.create(
-            model="deepseek-chat",
+            model=self.model,
             messages=messages
         )
         res = response.choices[0].message.content
         output = response.model_dump()
         output["input"] = _user_prompt
+        outpath = self.save_output(output, inpath)
+        if reply is not None:
+            reply.update(key=key, content=res, outpath=outpath, cached=False)
+        elif self.cache is not None and res:
+            self.cache.put(key, res, outpath)
+        return res, outpath
+
+    @staticmethod
+    def save_output(output, inpath):
+        """保存原始返回记录，返回记录路径"""
         name = path.splitext(path.split(inpath)[1])[0]
         outpath = "output/"+datetime.now().strftime("%Y-%m-%d %H-%M-%S")+f"{name}.txt"
         with open(outpath, 'a+', encoding='utf-8') as file:
             file.write(str(output))
-        return res, outpath
+        return outpath
+
+    def stream_pairs(self, _user_prompt, inpath, _system_prompt, reply=None):
+        """流式请求，逐行生成返回的 [输入句, 转化句]
+        连续STREAM_BAD_LINES个非空行不符合格式、或返回因长度上限被截断时，
+        中断请求并在已生成的句对之后抛出StreamAborted；
+        完整的返回记录到reply字典中（同get_dsres），不完整的返回不记录"""
+        if reply is None:
+            reply = {}
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(_system_prompt, _user_prompt, self.model)
+            if cached := self.cache.get(key):
+                reply.update(key=key, content=cached[0], outpath=cached[1], cached=True)
+                yield from self.parse_pairs(cached[0])
+                return
+        messages = [{"role": "system", "content": _system_prompt},
+                    {"role": "user", "content": _user_prompt}]
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        output = {"input": _user_prompt}
+        parts, buf, bad, aborted = [], "", 0, ""
+        try:
+            for chunk in stream:
+                output.setdefault("id", chunk.id)
+                if chunk.usage is not None:
+                    output["usage"] = chunk.usage.model_dump()
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    output["finish_reason"] = choice.finish_reason
+                text = choice.delta.content or ""
+                parts.append(text)
+                *lines, buf = (buf + text).split("\n")
+                for line in lines:
+                    if (pair := parse_pair(line)) is not None:
+                        bad = 0
+                        yield pair
+                    elif line.strip():
+                        bad += 1
+                        if bad >= STREAM_BAD_LINES:
+                            aborted = f"连续{bad}行不符合 输入句//转化句 格式"
+                            break
+                if aborted:
+                    break
+            if not aborted:
+                if output.get("finish_reason") == "length":
+                    aborted = "返回长度达到上限被截断"  # 最后一行可能不完整，不使用
+                elif (pair := parse_pair(buf)) is not None:
+                    yield pair
+        finally:
+            stream.close()
+            output["content"] = "".join(parts)
+            if aborted:
+                output["aborted"] = aborted
+            outpath = self.save_output(output, inpath)
+        if aborted:
+            raise StreamAborted(aborted)
+        reply.update(key=key, content=output["content"], outpath=outpath, cached=False)
+
+    def request_pairs(self, _user_prompt, inpath, _system_prompt, reply=None):
+        """请求并生成返回的 [输入句, 转化句]，流式模式下边接收边生成；
+        完整的返回记录到reply字典中，匹配后用settle决定是否写入缓存"""
+        if self.stream:
+            yield from self.stream_pairs(_user_prompt, inpath, _system_prompt, reply)
+        else:
+            res, outpath = self.get_dsres(_user_prompt, inpath, _system_prompt, reply if reply is not None else {})
+            yield from self.parse_pairs(res)
+
+    def settle(self, reply, ok):
+        """按匹配结果处理缓存：句子全部匹配时写入新的返回；
+        来自缓存的返回未能全部匹配时删除该条目，之后的请求重新获取"""
+        if self.cache is None or not reply.get("key"):
+            return
+        if ok and not reply["cached"] and reply["content"]:
+            self.cache.put(reply["key"], reply["content"], reply["outpath"])
+        elif not ok and reply["cached"]:
+            self.cache.delete(reply["key"])
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    @staticmethod
+    def parse_pairs(res):
+        """将返回内容拆分为 [输入句, 转化句] 列表"""
+        res = list(map(lambda line: line.replace("\u3000", " ").strip(), res.split("\n")))
+        res = [line for line in res if "//" in line]
+        lis = []
+        for item in res:
+            i, o = item.split("//")
+            lis.append([i.strip(), o.strip()])
+        return lis
+
+    @staticmethod
+    def match_pairs(kind, lines, lis):
+        """按内容将返回的句对匹配回输入的LyricLine，结果写入与kind同名的字段，
+        返回 (匹配成功的行, 未匹配的行)"""
+        matcher = PairMatcher(kind, lines)
+        for i, o in lis:
+            matcher.add(i, o)
+        return matcher.finish()
+
+    def convert(self, kind, _input: list, inpath, output=None):
+        """逐文件转化LyricLine列表的主干句，未匹配的句子最多重试3轮"""
+        prompt = self.prompts[kind]
+        lis1, output = list(_input), list(output or [])
+        for nn in range(3):
+            if lis1:
+                in1 = [line.root for line in lis1]
+                matcher = PairMatcher(kind, lis1)
+                aborted = False
+                reply = {}
+                try:
+                    for i, o in self.request_pairs("\n".join(in1), inpath, prompt, reply):
+                        matcher.add(i, o)
+                except StreamAborted as e:
+                    logging.warning(f"中断请求:{kind} {e} {inpath}")
+                    aborted = True
+                res, dedu = matcher.finish()
+                self.settle(reply, not dedu)
+                output += res
+                # 请求被中断、或缓存的返回无法匹配（已删除）时，即使没有进展也重新请求
+                if lis1 == dedu and not aborted and not reply.get("cached"):
+                    break
+                lis1 = list(dedu)
+                if nn < 2:
+                    sleep(1)
+            else:
+                break
+        if lis1:
+            strin = "\n".join([line.tag + line.root for line in lis1])
+            logging.warning(f"处理异常:{kind}句子结构变动{inpath}\n{strin}")
+        return output
+
+    def convert_packed(self, kind, packs, inpath):
+        """多首歌的句子去重后合并为一个请求，返回每首歌的 (匹配结果, 未匹配行)"""
+        lines = list(dict.fromkeys(line.root for texts in packs for line in texts))
+        matchers = [PairMatcher(kind, texts) for texts in packs]
+        reply = {}
+        try:
+            for i, o in self.request_pairs("\n".join(lines), inpath, self.prompts[kind], reply):
+                for matcher in matchers:
+                    matcher.add(i, o)
+        except StreamAborted as e:
+            logging.warning(f"中断合并请求:{kind} {e}")
+        results = [matcher.finish() for matcher in matchers]
+        self.settle(reply, not any(dedu for _, dedu in results))
+        return results
 
     def get_hira(self, _input, inpath):
         if isinstance(_input, str):
             res, outpath = self.get_dsres(_input, inpath, self.hira_prompt)
             return self.align_strings(_input.strip(), res.strip())
         elif isinstance(_input, list):
-            lis1, output = list(_input), []
-            for nn in range(3):
-                if lis1:
-                    dedu = []
-                    in1 = [list(row) for row in zip(*lis1)][1]
-                    res, outpath = self.get_dsres("\n".join(in1), inpath, self.hira_prompt)
-                    res = list(map(lambda line: line.replace("\u3000", " ").strip(), res.split("\n")))
-                    res = [line for line in res if "//" in line]
-                    lis = []
-                    for item in res:
-                        i, o = item.split("//")
-                        lis.append([i.strip(), o.strip()])
-                    for item in lis1:
-                        for i, o in lis:
-                            if stringsim(item[1], i):
-                                if i == o:
-                                    output.append(item + [i])
-                                else:
-                                    output.append(item + [self.align_strings(i, o)])
-                                break
-                        else:
-                            string = ""
-                            numlist = []
-                            tem = spstring(item[1])
-                            for n, (i, o) in enumerate(lis):
-                                s1 = spstring(i)
-                                if s1 in tem:
-                                    numlist.append(n)
-                                    string += s1
-                            if string == tem:
-                                s1, s2 = "", ""
-                                for n in numlist:
-                                    s1 += lis[n][0]
-                                    s2 += lis[n][1]
-                                s1, s2 = norstring(s1), norstring(s2)
-                                if s1 == s2:
-                                    output.append(item + [s1])
-                                else:
-                                    output.append(item + [self.align_strings(s1, s2)])
-                            else:
-                                dedu.append(item)
-                    if lis1 == dedu:
-                        break
-                    lis1 = list(dedu)
-                    if nn < 2:
-                        sleep(1)
-                else:
-                    break
-            if lis1:
-                strin = "\n".join([f"[{line[0]}]"+line[1] for line in lis1])
-                print(f"处理异常:hira句子结构变动{inpath}\n{strin}")
-            return output
+            return self.convert("hira", _input, inpath)
         else:
             raise ValueError("无效输入类型")
 
@@ -237,50 +420,7 @@ class DSAPI:
             res, outpath = self.get_dsres(_input, inpath, self.trans_prompt)
             return res.strip()
         elif isinstance(_input, list):
-            lis1, output = list(_input), []
-            for nn in range(3):
-                if lis1:
-                    dedu = []
-                    in1 = [list(row) for row in zip(*lis1)][1]
-                    res, outpath = self.get_dsres("\n".join(in1), inpath, self.trans_prompt)
-                    res = list(map(lambda line: line.replace("\u3000", " ").strip(), res.split("\n")))
-                    res = [line for line in res if "//" in line]
-                    lis = []
-                    for item in res:
-                        i, o = item.split("//")
-                        lis.append([i.strip(), o.strip()])
-                    for item in lis1:
-                        for i, o in lis:
-                            if stringsim(item[1], i):
-                                output.append(item + [o])
-                                break
-                        else:
-                            string = ""
-                            numlist = []
-                            tem = spstring(item[1])
-                            for n, (i, o) in enumerate(lis):
-                                s1 = spstring(i)
-                                if s1 in tem:
-                                    numlist.append(n)
-                                    string += s1
-                            if string == tem:
-                                s = ""
-                                for n in numlist:
-                                    s += lis[n][1]
-                                output.append(item + [s])
-                            else:
-                                dedu.append(item)
-                    if lis1 == dedu:
-                        break
-                    lis1 = list(dedu)
-                    if nn < 2:
-                        sleep(1)
-                else:
-                    break
-            if lis1:
-                strin = "\n".join([f"[{line[0]}]"+line[1] for line in lis1])
-                print(f"处理异常:chin句子结构变动{inpath}\n{strin}")
-            return output
+            return self.convert("chin", _input, inpath)
         else:
             raise ValueError("无效输出类型")
 
@@ -289,50 +429,7 @@ class DSAPI:
             res, outpath = self.get_dsres(_input, inpath, self.roma_prompt)
             return res.strip()
         elif isinstance(_input, list):
-            lis1, output = list(_input), []
-            for nn in range(3):
-                if lis1:
-                    dedu = []
-                    in1 = [list(row) for row in zip(*lis1)][1]
-                    res, outpath = self.get_dsres("\n".join(in1), inpath, self.roma_prompt)
-                    res = list(map(lambda line: line.replace("\u3000", " ").strip(), res.split("\n")))
-                    res = [line for line in res if "//" in line]
-                    lis = []
-                    for item in res:
-                        i, o = item.split("//")
-                        lis.append([i.strip(), o.strip()])
-                    for item in lis1:
-                        for i, o in lis:
-                            if stringsim(item[1], i):
-                                output.append(item + [o])
-                                break
-                        else:
-                            string = ""
-                            numlist = []
-                            tem = spstring(item[1])
-                            for n, (i, o) in enumerate(lis):
-                                s1 = spstring(i)
-                                if s1 in tem:
-                                    numlist.append(n)
-                                    string += s1
-                            if string == tem:
-                                s = ""
-                                for n in numlist:
-                                    s += lis[n][1]
-                                output.append(item + [s])
-                            else:
-                                dedu.append(item)
-                    if lis1 == dedu:
-                        break
-                    lis1 = list(dedu)
-                    if nn < 2:
-                        sleep(1)
-                else:
-                    break
-            if lis1:
-                strin = "\n".join([f"[{line[0]}]"+line[1] for line in lis1])
-                print(f"处理异常:roma句子结构变动{inpath}\n{strin}")
-            return output
+            return self.convert("roma", _input, inpath)
         else:
             raise ValueError("无效输出类型")
 
@@ -2,8 +2,35 @@
 from mutagen.flac import FLAC
 from mutagen.id3 import ID3, USLT, SYLT, Encoding
 from mutagen.oggopus import OggOpus
+import logging
+import os
 from os import path
-from mutagen.mp3 import MP3
+from tools.lyric import LyricDocument
+
+LRC_EXTS = (".mp3", ".flac", ".opus", ".txt", ".lrc")
+
+
+def collect_all_files(paths):
+    """从路径列表中收集所有有效文件"""
+    valid_files = []
+    for path_str in paths:
+        path_str = path_str.strip()
+        if not path_str:
+            continue
+        if not path.exists(path_str):
+            logging.warning(f"路径不存在: {path_str}")
+            continue
+        if path.isfile(path_str):
+            if path_str.lower().endswith(LRC_EXTS):
+                valid_files.append(path_str)
+            else:
+                logging.warning(f"不支持的文件格式: {path_str}")
+        elif path.isdir(path_str):
+            for root, _, files in os.walk(path_str):
+                for file in files:
+                    if file.lower().endswith(LRC_EXTS):
+                        valid_files.append(path.join(root, file))
+    return valid_files
 
 
 def convert_lrc_to_synced_lyrics(lrc_lines):
@@ -43,16 +70,17 @@ class MusicLrcEditor:
     def __init__(self, _path):
         self.path = _path
         self.lrc = None
+        self.audio = None  # 读取时解析的标签对象，写回同一文件时复用
         if path.exists(self.path):
             """自动检测文件类型并读取歌词"""
             ext = path.splitext(self.path)[1].lower()
-            if ext in ['.flac', '.mp3', '.opus', ".lrc", ".txt"]:
+            if ext in LRC_EXTS:
                 self.ext = ext
             else:
-                print(f"不支持的文件格式: {ext}:{self.path}")
+                logging.warning(f"不支持的文件格式: {ext}:{self.path}")
                 self.ext = None
         else:
-            print(f"无效路径: {self.path}")
+            logging.warning(f"无效路径: {self.path}")
             self.ext = None
 
     def isreadlrc(self):
@@ -61,17 +89,28 @@ class MusicLrcEditor:
         else:
             return False
 
+    def load_tags(self):
+        """解析音频文件的标签并保存在self.audio，MP3只解析ID3标签区域"""
+        if self.ext == '.flac':
+            self.audio = FLAC(self.path)
+        elif self.ext == '.mp3':
+            self.audio = ID3(self.path)
+        elif self.ext == '.opus':
+            self.audio = OggOpus(self.path)
+        return self.audio
+
     def read_lyrics(self) -> list:
         try:
             if self.ext == '.flac':
-                self.ext = '.flac'
-                self.lrc = self.get_flac_lyrics(self.path)
+                self.lrc = self.get_flac_lyrics(self.load_tags())
             elif self.ext == '.mp3':
-                self.ext = '.mp3'
-                self.lrc = self.get_mp3_lyrics(self.path)
+                try:
+                    self.lrc = self.get_mp3_lyrics(self.load_tags())
+                except Exception as e:
+                    logging.error(f"读取MP3歌词时出错:{self.path}\n{e}")
+                    self.lrc = None
             elif self.ext == '.opus':
-                self.ext = '.opus'
-                self.lrc = self.get_opus_lyrics(self.path)
+                self.lrc = self.get_opus_lyrics(self.load_tags())
             elif self.ext in [".lrc", ".txt"]:
                 with open(self.path, 'r', encoding='utf-8') as f:
                     self.lrc = f.readlines()
@@ -84,54 +123,58 @@ class MusicLrcEditor:
                     _lines += [_i.replace("\r", "").replace("\n", "")]
                 self.lrc = _lines
             elif self.lrc is None:
-                print(f"self.lrc 读取错误(None):{self.path}")
+                logging.error(f"self.lrc 读取错误(None):{self.path}")
                 return []
             else:
-                print(f"self.lrc 无效格式[{type(self.lrc)}]:{self.path}")
+                logging.error(f"self.lrc 无效格式[{type(self.lrc)}]:{self.path}")
                 return []
             return self.lrc
         except Exception as e:
-            print(f"读取{self.ext}歌词失败: :{self.path}\n{e}")
+            logging.error(f"读取{self.ext}歌词失败: :{self.path}\n{e}")
             return []
 
     def write_lyrics(self, wt_path: str = "") -> bool:
         # print(wt_path)
         if wt_path:
             if not path.exists(wt_path):
-                print(f"不存在的路径: {wt_path}")
+                logging.warning(f"不存在的路径: {wt_path}")
                 return False
             ext = path.splitext(wt_path)[1].lower()
         else:
             wt_path = self.path
             ext = self.ext
         # print(self.lrc)
-        if isinstance(self.lrc, list):
+        synced = None
+        if isinstance(self.lrc, LyricDocument):
+            _lines = "\n".join(self.lrc.to_lines())
+            synced = self.lrc.synced()
+        elif isinstance(self.lrc, list):
             _lines = "\n".join(self.lrc)
         else:
-            print(f"self.lrc 无效格式[{type(self.lrc)}]:{self.path}")
+            logging.error(f"self.lrc 无效格式[{type(self.lrc)}]:{self.path}")
             return False
+        # 写回读取的文件时复用已解析的标签，不再重新解析整个文件
+        audio = self.audio if path.abspath(wt_path) == path.abspath(self.path) else None
         try:
             if ext == '.flac':
-                self.write_flac_lyrics(wt_path, _lines)
+                self.write_flac_lyrics(wt_path, _lines, audio)
             elif ext == '.mp3':
-                self.write_mp3_lyrics_mutagen(wt_path, _lines)
+                self.write_mp3_lyrics_mutagen(wt_path, _lines, synced, audio)
             elif ext == '.opus':
-                self.write_opus_lyrics(wt_path, _lines)
+                self.write_opus_lyrics(wt_path, _lines, audio)
             elif ext in [".lrc", ".txt"]:
                 with open(wt_path, 'w+', encoding='utf-8') as f:
                     f.write(_lines)
 
         except Exception as e:
-            print(f"写入歌词失败: {wt_path}\n{e}")
+            logging.error(f"写入歌词失败: {wt_path}\n{e}")
             return False
         else:
             return True
 
     @staticmethod
-    def get_flac_lyrics(file_path):
-        """读取FLAC文件的歌词"""
-        audio = FLAC(file_path)
-
+    def get_flac_lyrics(audio):
+        """读取FLAC文件的歌词，audio为FLAC对象"""
         # 检查是否有歌词
         if 'lyrics' in audio.tags:
             return audio['lyrics'][0]
@@ -145,30 +188,24 @@ class MusicLrcEditor:
             return None
 
     @staticmethod
-    def get_mp3_lyrics(file_path):
-        """读取MP3文件的歌词"""
-        try:
-            audio = ID3(file_path)
-            # 查找USLT帧（非同步
-            for frame in audio.values():
-                if isinstance(frame, USLT):
-                    return frame.text
-            # 查找SYLT帧（同步歌词）
-            for frame in audio.values():
-                if isinstance(frame, SYLT):
-                    if isinstance(frame.text[0][0], str):
-                        return "\n".join([text for (text, _) in frame.text])
-                    else:
-                        return "\n".join([text for (_, text) in frame.text])
-            return None
-        except Exception as e:
-            print(f"读取MP3歌词时出错:{file_path}\n{e}")
-            return None
+    def get_mp3_lyrics(audio):
+        """读取MP3文件的歌词，audio为ID3标签对象"""
+        # 查找USLT帧（非同步
+        for frame in audio.values():
+            if isinstance(frame, USLT):
+                return frame.text
+        # 查找SYLT帧（同步歌词）
+        for frame in audio.values():
+            if isinstance(frame, SYLT):
+                if isinstance(frame.text[0][0], str):
+                    return "\n".join([text for (text, _) in frame.text])
+                else:
+                    return "\n".join([text for (_, text) in frame.text])
+        return None
 
     @staticmethod
-    def get_opus_lyrics(file_path):
-        audio = OggOpus(file_path)
-
+    def get_opus_lyrics(audio):
+        """读取Opus文件的歌词，audio为OggOpus对象"""
         # 检查常见歌词标签
         lyrics_tags = ['lyrics', 'LYRICS', 'UNSYNCEDLYRICS', 'SYNCEDLYRICS']
 
@@ -184,16 +221,19 @@ class MusicLrcEditor:
         return None
 
     @staticmethod
-    def write_flac_lyrics(file_path, lyrics_text):
-        """向FLAC文件写入歌词"""
-        audio = FLAC(file_path)
+    def write_flac_lyrics(file_path, lyrics_text, audio=None):
+        """向FLAC文件写入歌词，audio为已解析的FLAC对象"""
+        if audio is None:
+            audio = FLAC(file_path)
         audio["lyrics"] = lyrics_text
         audio.save()
 
     @staticmethod
-    def write_mp3_lyrics_mutagen(file_path, lyrics_text):
-        audio = MP3(file_path, ID3=ID3)
-        lyrics1 = convert_lrc_to_synced_lyrics(lyrics_text)
+    def write_mp3_lyrics_mutagen(file_path, lyrics_text, synced=None, tags=None):
+        """synced为[(毫秒, 文本), ...]，未给出时从lyrics_text解析；tags为已解析的ID3标签"""
+        if tags is None:
+            tags = ID3(file_path)
+        lyrics1 = synced if synced is not None else convert_lrc_to_synced_lyrics(lyrics_text)
         lyrics = []
         for timestamp, text in lyrics1:
             lyrics.append((text, int(timestamp)))
@@ -212,18 +252,19 @@ class MusicLrcEditor:
             desc="Lyrics",
             text=lyrics_text
         )
-        audio.tags.delall('SYLT')
-        audio.tags.delall('USLT')
+        tags.delall('SYLT')
+        tags.delall('USLT')
         # 添加同步歌词帧到ID3标签
-        audio.tags.add(sylt)
-        audio.tags.add(uslt)
-        # 保存修改
-        audio.save(file_path)
+        tags.add(sylt)
+        tags.add(uslt)
+        # 保存修改（只重写ID3标签）
+        tags.save(file_path)
 
     @staticmethod
-    def write_opus_lyrics(file_path, lyrics_text):
-        """向Opus文件写入歌词"""
-        audio = OggOpus(file_path)
+    def write_opus_lyrics(file_path, lyrics_text, audio=None):
+        """向Opus文件写入歌词，audio为已解析的OggOpus对象"""
+        if audio is None:
+            audio = OggOpus(file_path)
         audio["lyrics"] = lyrics_text
         audio.save()
 
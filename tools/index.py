@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import path, scandir, stat
+
+from tools.cache import ProcessConnection
+from tools.file import LRC_EXTS
+from tools.journal import lyrics_hash
+from tools.scan import SCAN_WORKERS, read_and_classify
+
+QUERY_KEYS = ("class", "result", "seq", "mode")
+
+
+class LibraryIndex:
+    """
+    音乐库索引（SQLite）
+
+    以路径为键保存大小、修改时间、歌词哈希、扫描分类及最近一次处理的结果/seq/mode。
+    重新扫描时只读取大小或修改时间变化的文件；目录按修改时间缓存其条目，
+    未变化的目录不再重新列举。收集时删除所遍历目录下已不存在的文件与目录的记录。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = ProcessConnection(db_path, (
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT, "
+            "class TEXT, result TEXT, seq TEXT, mode TEXT, updated TEXT)",
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime INTEGER, entries TEXT)",
+        ))
+
+    def _db(self):
+        return self._conn.get()
+
+    def walk(self, paths) -> list:
+        """与collect_all_files相同，从路径列表中收集所有有效文件，未变化的目录使用缓存的条目"""
+        valid_files = []
+        with self._lock:
+            conn = self._db()
+            with conn:
+                for path_str in paths:
+                    path_str = path_str.strip()
+                    if not path_str:
+                        continue
+                    if not path.exists(path_str):
+                        logging.warning(f"路径不存在: {path_str}")
+                        continue
+                    if path.isfile(path_str):
+                        if path_str.lower().endswith(LRC_EXTS):
+                            valid_files.append(path_str)
+                        else:
+                            logging.warning(f"不支持的文件格式: {path_str}")
+                    elif path.isdir(path_str):
+                        start, seen_dirs = len(valid_files), set()
+                        self._walk_dir(conn, path_str, valid_files, seen_dirs)
+                        self._prune(conn, path_str, {path.abspath(file) for file in valid_files[start:]}, seen_dirs)
+        return valid_files
+
+    @staticmethod
+    def _prune(conn, root, seen_files, seen_dirs):
+        """删除root下本次遍历未出现的文件与目录记录（已删除、或被未使用索引的运行移走）"""
+        prefix = path.join(path.abspath(root), "")
+        for table, seen in (("files", seen_files), ("dirs", seen_dirs)):
+            stale = [(row[0],) for row in conn.execute(f"SELECT path FROM {table} WHERE substr(path, 1, ?)=?",
+                                                       (len(prefix), prefix))
+                     if row[0] not in seen]
+            conn.executemany(f"DELETE FROM {table} WHERE path=?", stale)
+
+    def _walk_dir(self, conn, dirpath, valid_files, seen_dirs):
+        seen_dirs.add(path.abspath(dirpath))
+        mtime = stat(dirpath).st_mtime_ns
+        row = conn.execute("SELECT mtime, entries FROM dirs WHERE path=?", (path.abspath(dirpath),)).fetchone()
+        if row is not None and row[0] == mtime:
+            files, dirs = json.loads(row[1])
+        else:
+            files, dirs = [], []
+            with scandir(dirpath) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if not entry.is_symlink():  # 与os.walk一致，不进入目录链接
+                            dirs.append(entry.name)
+                    elif entry.name.lower().endswith(LRC_EXTS):
+                        files.append(entry.name)
+            conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                         (path.abspath(dirpath), mtime, json.dumps([files, dirs], ensure_ascii=False)))
+        valid_files += [path.join(dirpath, file) for file in files]
+        for name in dirs:
+            self._walk_dir(conn, path.join(dirpath, name), valid_files, seen_dirs)
+
+    def _rows(self, files) -> dict:
+        """批量读取索引记录 {绝对路径: (大小, 修改时间, 分类)}"""
+        rows = {}
+        keys = list(dict.fromkeys(path.abspath(file) for file in files))
+        with self._lock:
+            conn = self._db()
+            for n in range(0, len(keys), 500):
+                part = keys[n:n + 500]
+                for row in conn.execute(f"SELECT path, size, mtime, class FROM files "
+                                        f"WHERE path IN ({','.join('?' * len(part))})", part):
+                    rows[row[0]] = row[1:]
+        return rows
+
+    def scan(self, files, workers=SCAN_WORKERS):
+        """增量扫描，按输入顺序生成 (路径, 分类)；大小与修改时间未变的文件直接使用索引中的分类"""
+        rows = self._rows(files)
+
+        def check(file):
+            try:
+                st = stat(file)
+            except OSError:
+                return "unreadable", None
+            row = rows.get(path.abspath(file))
+            if row is not None and row[2] and row[:2] == (st.st_size, st.st_mtime_ns):
+                return row[2], None
+            result, lines = read_and_classify(file)
+            return result, (st.st_size, st.st_mtime_ns, lyrics_hash(lines) if lines else "")
+
+        with ThreadPoolExecutor(max(workers, 1)) as pool:
+            for file, (result, changed) in zip(files, pool.map(check, files)):
+                if changed is not None:
+                    with self._lock:
+                        with self._db() as conn:
+                            conn.execute("INSERT INTO files (path, size, mtime, hash, class, updated) "
+                                         "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+                                         "size=excluded.size, mtime=excluded.mtime, hash=excluded.hash, "
+                                         "class=excluded.class, updated=excluded.updated",
+                                         (path.abspath(file), *changed, result,
+                                          datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                yield file, result
+
+    def record(self, src, dest, result, seq, mode, lines=None):
+        """记录处理结果，dest为移动后的路径；分类沿用src的索引记录"""
+        src, dest = path.abspath(src), path.abspath(dest)
+        size = mtime = None
+        if path.exists(dest):
+            st = stat(dest)
+            size, mtime = st.st_size, st.st_mtime_ns
+        with self._lock:
+            with self._db() as conn:
+                row = conn.execute("SELECT class, hash FROM files WHERE path=?", (src,)).fetchone()
+                _class, _hash = row if row is not None else (None, "")
+                if src != dest:
+                    conn.execute("DELETE FROM files WHERE path=?", (src,))
+                conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (dest, size, mtime, lyrics_hash(lines) if lines else _hash, _class,
+                              result, seq, mode, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    def query(self, conditions) -> list:
+        """
+        按条件查询文件路径，条件形如 "result=defect"、"class=japanese"、"seq!=chin"
+
+        可用的键为 class/result/seq/mode；seq按注音项匹配，"seq=chin" 表示处理时的seq包含chin，
+        "seq!=chin" 表示最近一次处理未包含chin（或尚未处理）；多个条件同时满足。
+        已不存在的文件不返回，其记录一并删除。
+        """
+        where, params = [], []
+        for cond in conditions:
+            key, neg, value = cond.partition("!=") if "!=" in cond else cond.partition("=")
+            key, value = key.strip(), value.strip()
+            if key not in QUERY_KEYS or not neg:
+                raise ValueError(f"无效的查询条件: {cond}")
+            if key == "seq":
+                expr, value = "('-' || seq || '-') LIKE ?", f"%-{value}-%"
+            else:
+                expr = f"{key}=?"
+            where.append(f"({key} IS NULL OR NOT {expr})" if neg == "!=" else expr)
+            params.append(value)
+        sql = "SELECT path FROM files" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY path"
+        with self._lock:
+            with self._db() as conn:
+                files = [row[0] for row in conn.execute(sql, params)]
+                missing = [file for file in files if not path.exists(file)]
+                conn.executemany("DELETE FROM files WHERE path=?", [(file,) for file in missing])
+        if missing:
+            logging.info(f"已从索引中删除不存在的文件 {len(missing)} 个")
+            missing = set(missing)
+            files = [file for file in files if file not in missing]
+        return files
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import threading
+from datetime import datetime
+from os import path, makedirs, stat, getpid
+
+from tools.file import MusicLrcEditor
+
+DONE_RESULTS = ("success", "defect", "other")  # 续传时可跳过的结果，error会重新处理
+
+
+def lyrics_hash(lines) -> str:
+    """歌词内容哈希，lines为read_lyrics返回的行列表"""
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """
+    只追加的运行记录（JSON行）
+
+    每处理完一个文件写入一行：结果、移动后的路径、大小/修改时间、歌词哈希及所用的seq/mode，
+    写入后立即flush。续传时据此跳过已完成的文件。
+    """
+
+    def __init__(self, journal_path, seq, mode):
+        self.path = journal_path
+        self.seq = seq
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def record(self, src, dest, result, lines=None):
+        """记录单个文件的处理结果，dest为移动后的路径"""
+        entry = {"path": path.abspath(dest), "src": path.abspath(src), "result": result,
+                 "seq": self.seq, "mode": self.mode, "hash": lyrics_hash(lines) if lines else "",
+                 "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        if path.exists(dest):
+            st = stat(dest)
+            entry["size"], entry["mtime"] = st.st_size, st.st_mtime_ns
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None or self._pid != getpid():
+                _dir = path.dirname(self.path)
+                if _dir and not path.exists(_dir):
+                    makedirs(_dir, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                self._pid = getpid()
+            self._file.write(line)
+            self._file.flush()
+
+    def load(self) -> dict:
+        """读取记录，返回 {路径: 最后一条记录}，只保留当前seq/mode的记录"""
+        entries = {}
+        if not path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 中断时可能留下不完整的最后一行
+                if entry.get("seq") == self.seq and entry.get("mode") == self.mode:
+                    entries[entry["path"]] = entry
+        return entries
+
+    def pending(self, files) -> list:
+        """过滤掉已完成的文件：大小与修改时间一致直接跳过，否则比对歌词哈希"""
+        entries = self.load()
+        res = []
+        for file in files:
+            entry = entries.get(path.abspath(file))
+            if entry is None or entry["result"] not in DONE_RESULTS:
+                res.append(file)
+                continue
+            st = stat(file)
+            if (st.st_size, st.st_mtime_ns) == (entry.get("size"), entry.get("mtime")):
+                continue
+            lines = MusicLrcEditor(file).read_lyrics()
+            if not lines or lyrics_hash(lines) != entry["hash"]:
+                res.append(file)
+        return res
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._pid == getpid():
+                self._file.close()
+            self._file = None
@@ -1,22 +1,171 @@
+import logging
 import re
 import shutil
-from os import path, makedirs
-import pykakasi
-import langid
-import opencc
-import MeCab
-pattern = r'\[(\d{1,3}):(\d{1,2})(?:[.:](\d{1,3}))?\]'
-_pat1 = re.compile(r'\[[a-zA-Z]+:')
-_pat2 = re.compile(r'[词詞曲歌手制作人原唱]\s*[:∶：]')  # r'词：|曲：|歌手：'
-_pat3 = re.compile(r'[\u3040-\u309f\u30a0-\u30ff]')
-_pat4 = re.compile(r'[\u4e00-\u9faf'
-                   r'\u3400-\u4dbf'
-                   r'\U00020000-\U0002a6df'
-                   r'\U0002a700-\U0002b73f'
-                   r'\U0002b740-\U0002b81f'
-                   r'\U0002b820-\U0002ceaf]')
-_pat5 = re.compile(r'\[(\d{1,3}):(\d{1,2})(?:[.:](\d{1,3}))?\]')
-_kks = pykakasi.kakasi()
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+from os import path, makedirs, walk
+from tools.cache import ReadingCache
+from tools.align import align_strings
+from tools.lyric import LyricLine, format_time, tokenize_lrc
+# pykakasi、MeCab、OpenCC与langid加载较慢，均在首次使用时导入
+# 界面程序会在后台线程预加载，加锁避免与处理线程重复构建
+_init_lock = threading.RLock()
+_kks = None
+_tagger = None
+_t2s = None
+_trad_chars = None
+_phrase_chars = None
+_identifier = None
+LANGS = ("zh", "ja", "en", "ko")  # 语言识别只在这些语言中比较
+# 繁转简可能涉及的字符范围：部首、CJK统一汉字及扩展、兼容汉字、竖排标点
+_CJK_RANGES = ((0x2E80, 0x9FFF), (0xF900, 0xFAFF), (0xFE30, 0xFE4F), (0x20000, 0x2FA1F))
+_UNKNOWN = object()  # 词组表无法读取时的_phrase_chars，所有行整行转换
+
+
+def get_kks():
+    """返回进程内共享的pykakasi转换器"""
+    global _kks
+    if _kks is None:
+        with _init_lock:
+            if _kks is None:
+                import pykakasi
+                _kks = pykakasi.kakasi()
+    return _kks
+
+
+def get_tagger():
+    """返回进程内共享的MeCab分词器，首次调用时加载词典"""
+    global _tagger
+    if _tagger is None:
+        with _init_lock:
+            if _tagger is None:
+                import MeCab
+                _tagger = MeCab.Tagger()
+    return _tagger
+
+
+def get_t2s():
+    """返回进程内共享的繁转简转换器"""
+    global _t2s
+    if _t2s is None:
+        with _init_lock:
+            if _t2s is None:
+                import opencc
+                _t2s = opencc.OpenCC('t2s')
+    return _t2s
+
+
+def _convert_each(texts) -> list:
+    """逐项繁转简，以换行分隔一次转换，避免相邻项被当作词组匹配"""
+    converted = get_t2s().convert("\n".join(texts)).split("\n")
+    if len(converted) != len(texts):
+        converted = [get_t2s().convert(text) for text in texts]
+    return converted
+
+
+def get_trad_chars():
+    """返回繁转简前后不同的字符集合，首次调用时用共享转换器一次性生成"""
+    global _trad_chars
+    if _trad_chars is None:
+        with _init_lock:
+            if _trad_chars is None:
+                chars = [chr(code) for start, end in _CJK_RANGES for code in range(start, end + 1)]
+                _trad_chars = frozenset(c for c, s in zip(chars, _convert_each(chars)) if c != s)
+    return _trad_chars
+
+
+def _t2s_phrase_keys():
+    """读取已安装OpenCC的繁转简词组表(TSPhrases)的词条，无法读取时返回None
+    纯Python实现为文本词典；C++实现为ocd2，用包内或PATH中的opencc_dict导出为文本"""
+    import opencc
+    for root, _, files in walk(path.dirname(path.abspath(opencc.__file__))):
+        if "TSPhrases.txt" in files:
+            with open(path.join(root, "TSPhrases.txt"), "r", encoding="utf-8") as f:
+                return [line.split("\t")[0] for line in f if line.strip()]
+        if "TSPhrases.ocd2" in files:
+            tool = shutil.which("opencc_dict", path=path.join(path.dirname(root), "..", "bin")) or \
+                shutil.which("opencc_dict")
+            if tool is None:
+                return None
+            with tempfile.TemporaryDirectory() as tmp:
+                out = path.join(tmp, "TSPhrases.txt")
+                try:
+                    subprocess.run([tool, "-i", path.join(root, "TSPhrases.ocd2"), "-o", out,
+                                    "-f", "ocd2", "-t", "text"], check=True, capture_output=True, timeout=30)
+                    with open(out, "r", encoding="utf-8") as f:
+                        return [line.split("\t")[0] for line in f if line.strip()]
+                except (OSError, subprocess.SubprocessError):
+                    return None
+    return None
+
+
+def get_phrase_chars():
+    """返回词组转换结果与逐字转换不同的词条所含的字，含这些字的行需整行转换；
+    由已安装的词组表生成，词组表无法读取时返回None（所有行整行转换）"""
+    global _phrase_chars
+    if _phrase_chars is None:
+        with _init_lock:
+            if _phrase_chars is None:
+                keys = _t2s_phrase_keys()
+                if keys is None:
+                    logging.debug("无法读取OpenCC词组表，繁体检测改为整行转换")
+                    _phrase_chars = _UNKNOWN
+                else:
+                    keys = [key for key in keys if len(key) > 1]
+                    chars = list(dict.fromkeys("".join(keys)))
+                    single = dict(zip(chars, _convert_each(chars)))
+                    found = set()
+                    for key, whole in zip(keys, _convert_each(keys)):
+                        each = [single[c] for c in key]
+                        if whole == "".join(each):
+                            continue
+                        # 只需记录转换结果不同的位置上的字：不含这些字的行不可能包含该词条
+                        if len(whole) == len(key) and all(len(e) == 1 for e in each):
+                            found.update(c for c, w, e in zip(key, whole, each) if w != e)
+                        else:
+                            found.update(key)
+                    _phrase_chars = frozenset(found)
+    return None if _phrase_chars is _UNKNOWN else _phrase_chars
+
+
+def get_identifier():
+    """返回进程内共享、限定语言范围的langid识别器"""
+    global _identifier
+    if _identifier is None:
+        with _init_lock:
+            if _identifier is None:
+                from langid.langid import LanguageIdentifier, model
+                identifier = LanguageIdentifier.from_modelstring(model, norm_probs=False)
+                identifier.set_languages(LANGS)
+                _identifier = identifier
+    return _identifier
+
+
+def classify_langs(texts) -> dict:
+    """批量识别语言，返回 {文本: (语言, 得分)}；所有文本的特征向量合并为一次矩阵乘法"""
+    texts = list(dict.fromkeys(texts))
+    if not texts:
+        return {}
+    import numpy as np
+    identifier = get_identifier()
+    fv = np.array([identifier.instance2fv(text) for text in texts])
+    probs = np.dot(fv, identifier.nb_ptc) + identifier.nb_pc
+    best = probs.argmax(axis=1)
+    return {text: (str(identifier.nb_classes[cl]), float(probs[n, cl]))
+            for n, (text, cl) in enumerate(zip(texts, best))}
+
+
+def warmup():
+    """预加载pykakasi、MeCab、OpenCC与langid模型
+    在创建进程池前调用，fork出的子进程可按写时复制共享已加载的词典；
+    界面程序在窗口显示后于后台线程调用"""
+    get_kks()
+    get_tagger()
+    get_trad_chars()
+    get_phrase_chars()
+    get_identifier()
 
 
 def spstring(text):
@@ -27,11 +176,66 @@ def spstring(text):
 
 
 def checktrad(text):
-    """判断字符串是否包含繁体字"""
-    converter = opencc.OpenCC('t2s')  # 繁体转简体配置
-    simplified = converter.convert(text)
-    # print(simplified)
-    return simplified != text  # 如果转换前后不同，说明包含繁体字
+    """判断字符串是否包含繁体字（繁转简前后不同）
+    不含词组相关字时，结果等同于逐字查表，无需转换"""
+    phrase_chars = get_phrase_chars()
+    if phrase_chars is None or not phrase_chars.isdisjoint(text):
+        return get_t2s().convert(text) != text
+    return not get_trad_chars().isdisjoint(text)
+
+
+class ScriptProfile:
+    """单行文本的字符构成：假名、汉字、ASCII与繁体字的个数，traditional与checktrad结果一致"""
+    __slots__ = ("size", "kana", "kanji", "ascii", "trad", "traditional")
+
+    def __init__(self, size, kana, kanji, ascii, trad, traditional):
+        self.size = size
+        self.kana = kana
+        self.kanji = kanji
+        self.ascii = ascii
+        self.trad = trad
+        self.traditional = traditional
+
+    @property
+    def is_ascii(self):
+        return self.ascii == self.size
+
+    def __repr__(self):
+        return (f"ScriptProfile(kana={self.kana}, kanji={self.kanji}, ascii={self.ascii}/{self.size}, "
+                f"trad={self.trad}, traditional={self.traditional})")
+
+
+@lru_cache(maxsize=1 << 16)
+def script_profile(text) -> ScriptProfile:
+    """一次遍历统计文本的字符构成，相同文本直接复用结果"""
+    trad_chars = get_trad_chars()
+    phrase_chars = get_phrase_chars()
+    kana = kanji = ascii = trad = 0
+    phrase = phrase_chars is None
+    for char in text:
+        code = ord(char)
+        if code < 0x80:
+            ascii += 1
+            continue
+        if 0x3040 <= code <= 0x30ff:  # 平假名、片假名
+            kana += 1
+            continue
+        if (0x4e00 <= code <= 0x9faf or 0x3400 <= code <= 0x4dbf
+                or 0x20000 <= code <= 0x2a6df or 0x2a700 <= code <= 0x2ceaf):
+            kanji += 1
+        if char in trad_chars:
+            trad += 1
+        if phrase_chars is not None and char in phrase_chars:
+            phrase = True
+    traditional = get_t2s().convert(text) != text if phrase else trad > 0
+    return ScriptProfile(len(text), kana, kanji, ascii, trad, traditional)
+
+
+def line_profiles(line) -> tuple:
+    """LyricLine各候选行的字符构成，计算一次后保存在line.profiles"""
+    if line.profiles is None:
+        line.profiles = tuple(map(script_profile, line.texts))
+    return line.profiles
 
 
 def katakana_to_hiragana(katakana):
@@ -46,6 +250,69 @@ def katakana_to_hiragana(katakana):
     return ''.join(hiragana)
 
 
+class Furigana:
+    """
+    常驻的MeCab注音器
+
+    分词器在整个进程内只加载一次，表层形式是否需要注音的判定结果也会缓存，
+    readings 可一次解析一首（或多首）歌的全部行。
+    """
+
+    def __init__(self, use_hiragana=True):
+        self.tagger = get_tagger()
+        self.kks = get_kks()
+        self.use_hiragana = use_hiragana
+        self._plain = {}  # 表层形式 -> 是否无需注音（kks平假名与原文一致）
+
+    def is_plain(self, surface):
+        plain = self._plain.get(surface)
+        if plain is None:
+            plain = "".join(item["hira"] for item in self.kks.convert(surface)) == surface
+            self._plain[surface] = plain
+        return plain
+
+    def reading(self, text):
+        """返回单行文本的注音结果"""
+        # 解析文本
+        node = self.tagger.parseToNode(text)
+        # 存储结果的列表
+        result = []
+        # 遍历解析结果
+        while node:
+            # 获取表面形式
+            surface = node.surface
+            # 只有非空字符串才处理
+            if surface:
+                if self.is_plain(surface):
+                    result.append(surface)
+                else:
+                    # 分割特征信息，读音通常在第7个位置（索引6）
+                    feature_parts = node.feature.split(',')
+                    if len(feature_parts) > 7 and feature_parts[6] and feature_parts[6] != '*':
+                        reading = feature_parts[6]
+                        # 如果需要平假名，则进行转换
+                        result.append(katakana_to_hiragana(reading) if self.use_hiragana else reading)
+                    else:
+                        # 没有读音信息时直接添加表面形式
+                        result.append(surface)
+            # 移动到下一个节点
+            node = node.next
+        return ''.join(result)
+
+    def readings(self, lines):
+        """批量注音，返回与输入逐行对应的结果，重复行只解析一次"""
+        done = {}
+        res = []
+        for line in lines:
+            if line not in done:
+                done[line] = self.reading(line)
+            res.append(done[line])
+        return res
+
+
+_furigana = {}
+
+
 def add_furigana(text, use_hiragana=True):
     """
     使用MeCab为日语文本添加平假名或片假名注音
@@ -57,57 +324,50 @@ def add_furigana(text, use_hiragana=True):
     返回:
         带有注音的文本，格式为"汉字[注音]"
     """
-    # 初始化MeCab分词器
-    tagger = MeCab.Tagger()
-    # 解析文本
-    node = tagger.parseToNode(text)
-    # 存储结果的列表
-    result = []
-    # 遍历解析结果
-    while node:
-        # 获取表面形式
-        surface = node.surface
-        # 获取特征信息（包含读音）
-        feature = node.feature
-        # 只有非空字符串才处理
-        if surface:
-            _line = ""
-            for item in _kks.convert(surface):
-                _line += item["hira"]
-            if _line == surface:
-                result.append(surface)
-            else:
-                # 分割特征信息
-                feature_parts = feature.split(',')
-                # 读音通常在第7个位置（索引6）
-                if len(feature_parts) > 7 and feature_parts[6] and feature_parts[6] != '*':
-                    reading = feature_parts[6]
-                    # 如果需要平假名，则进行转换
-                    if use_hiragana:
-                        phonetic = katakana_to_hiragana(reading)
-                    else:
-                        phonetic = reading
-                    result.append(phonetic)
-                else:
-                    # 没有读音信息时直接添加表面形式
-                    result.append(surface)
-        # 移动到下一个节点
-        node = node.next
-    return ''.join(result)
+    if use_hiragana not in _furigana:
+        _furigana[use_hiragana] = Furigana(use_hiragana)
+    return _furigana[use_hiragana].reading(text)
+
+
+CACHE_VERSION = "1"  # 注音逻辑改动时递增，使旧缓存失效
+
+
+def analyzer_version():
+    """注音结果所依赖的分析器/词典版本，用作缓存键的一部分"""
+    dic = get_tagger().dictionary_info()
+    import pykakasi
+    kks_version = getattr(pykakasi, "__version__", "")
+    return f"{CACHE_VERSION}|{dic.filename}|{dic.version}|pykakasi-{kks_version}"
 
 
 class LyrTrans:
-    def __init__(self):
+    def __init__(self, cache_path=""):
         # 输入日语，返回注音
         # "hira" 平假名
-        # "kana" 片假名
-        self.kks = _kks
+        # "roma" 罗马音
+        self.kks = get_kks()
+        self.furigana = Furigana()
+        self.cache = ReadingCache(cache_path, analyzer_version())
 
     def trans(self, _text: str, _seq: str = "hira"):
-        res = add_furigana(_text)
-        # print(_text)
-        # print( res)
-
+        return self.trans_lines([_text], (_seq,))[_seq][0]
+
+    def trans_lines(self, lines: list, seqs=("hira",)) -> dict:
+        """批量注音：优先读取缓存，未命中的行只经MeCab解析一次，返回 {类型: 逐行结果}"""
+        found = {_seq: self.cache.get_many(lines, _seq) for _seq in seqs}
+        missing = list(dict.fromkeys(line for line in lines
+                                     if any(line not in found[_seq] for _seq in seqs)))
+        if missing:
+            readings = dict(zip(missing, self.furigana.readings(missing)))
+            for _seq in seqs:
+                new = {line: self.convert(line, readings[line], _seq)
+                       for line in missing if line not in found[_seq]}
+                self.cache.put_many(new, _seq)
+                found[_seq].update(new)
+        return {_seq: [found[_seq][line] for line in lines] for _seq in seqs}
+
+    def convert(self, _text: str, res: str, _seq: str):
+        """由MeCab读音生成指定类型的注音"""
         if _seq == "hira":
             if res == _text:
                 return _text
@@ -121,112 +381,32 @@ class LyrTrans:
 
     @staticmethod
     def align_strings(str1: str, str2: str):
-        # 初始化矩阵
-        _m = len(str1)
-        _n = len(str2)
-        dp = [[0] * (_n + 1) for _ in range(_m + 1)]
-
-        # 填充矩阵
-        for _i in range(_m + 1):
-            for _j in range(_n + 1):
-                if _i == 0 or _j == 0:
-                    dp[_i][_j] = _i + _j
-                elif str1[_i - 1] == str2[_j - 1]:
-                    dp[_i][_j] = dp[_i - 1][_j - 1]
-                else:
-                    dp[_i][_j] = 1 + min(dp[_i - 1][_j], dp[_i][_j - 1])
-
-        # 回溯找出对齐方式
-        _i, _j = _m, _n
-        align1 = []
-        _kanji = False
-        while _i > 0 or _j > 0:
-            if _i > 0 and _j > 0 and str1[_i - 1] == str2[_j - 1]:
-                align1.append(str1[_i - 1])
-                _i -= 1
-                _j -= 1
-            elif _i > 0 and (_j == 0 or dp[_i - 1][_j] < dp[_i][_j - 1]):
-                if _kanji:
-                    align1.append("[")
-                    _kanji = False
-                _i -= 1
-            else:
-                if _kanji:
-                    align1.append(str2[_j - 1])
-                else:
-                    _kanji = True
-                    align1.append(str2[_j - 1] + "]")
-                _j -= 1
-
-        return ''.join(reversed(align1))
+        return align_strings(str1, str2)
 
 
-def stringconv(text):
-    punctuation_pattern = '\xa0\u3000'
-    text = re.sub(punctuation_pattern, ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-
-def lrc_split(lrc_lines: list) -> [list, list, list]:
-    exclude = ["//"]
+def lrc_split(lrc_lines) -> [list, list, list]:
     _lis1 = []  # [al:朗朗]
     _lis2 = []
     _lis3 = []  # 这是一行没有时间戳的歌词
     nlist = []
-    for line in lrc_lines:
-        if not line:
-            continue
+    for kind, time, content in tokenize_lrc(lrc_lines):
+        if kind == "timed":
+            nlist.append((format_time(time), content))
+        elif kind == "meta":
+            _lis1.append(content)
+        elif kind == "credit":
+            _lis2.append(f"[00:00.000]" + content)
         else:
-            line = stringconv(line)
-
-            if bool(re.search(_pat1, line)):
-                if ":" in line and len(line) < 100:
-                    if line.split(":")[1].strip("]"):
-                        _lis1.append(line)
-                continue
-            matches = re.finditer(pattern, line)
-            timestamps = []
-            for match in matches:
-                min_part = match.group(1)
-                sec_part = match.group(2)
-                ms_part = match.group(3) if match.group(3) else '000'  # 默认毫秒为000
-                timestamps.append((min_part, sec_part, ms_part))
-            if timestamps:
-                # 将时间戳转换为统一格式 (分:秒.毫秒)
-                formatted_timestamps = []
-                for _min, sec, ms in timestamps:
-                    # 补零处理
-                    _min = _min.zfill(2)
-                    sec = sec.zfill(2)
-                    ms = ms.ljust(3, '0')[:3]  # 确保毫秒是3位
-                    formatted = f"{_min}:{sec}.{ms}"
-                    formatted_timestamps.append(formatted)
-
-                # 提取歌词内容 (移除所有时间戳后的部分)
-                content = re.sub(pattern, '', line).strip()
-                contents = [content]
-                if not content or content in exclude or " - " in content:
-                    continue
-                elif " / " in content:
-                    contents = content.split(" / ")
-                if bool(re.search(_pat2, content)):
-                    for content in contents:
-                        _lis2.append(f"[00:00.000]" + content)
-                else:
-                    for timestamp in formatted_timestamps:
-                        for content in contents:
-                            nlist.append((timestamp, content))
-            else:
-                _lis3.append(line)
+            _lis3.append(content)
 
     return _lis1+_lis2, lrc_sort(nlist) if nlist else nlist, _lis3
 
 
-def check_jap(line_list):
+def check_jap(texts):
+    """texts为依次排列的歌词行（如LyricDocument.texts()），前几行中含假名的行超过2行即视为日语"""
     kana_num = 0
-    for _i, (_, line) in enumerate(line_list):
-        if bool(re.search(_pat3, line)):
+    for _i, line in enumerate(texts):
+        if script_profile(line).kana:
             kana_num += 1
             if kana_num > 2:
                 return True
@@ -237,38 +417,36 @@ def check_jap(line_list):
 
 # 歌词排序
 def lrc_sort(lrc_list: list) -> list:
-    times, _ = zip(*lrc_list)
-    times = list(dict.fromkeys(times))
-    nl = []
-    for time in times:
-        for t, l in lrc_list:
-            if time == t and [t, l] not in nl:
-                nl += [[t, l]]
-    return nl
+    """按时间戳首次出现的顺序分组并去除重复行，组内保持原顺序"""
+    groups = {}
+    for t, l in lrc_list:
+        groups.setdefault(t, {})[l] = None  # dict作有序集合
+    return [[t, l] for t, lines in groups.items() for l in lines]
+
+
+def group_by_time(lrc_list) -> dict:
+    """按时间戳（每项第一个元素）分组，保持首次出现顺序与组内顺序"""
+    groups = {}
+    for item in lrc_list:
+        groups.setdefault(item[0], []).append(item)
+    return groups
 
 
 def listsort(lrc_list: list) -> list:
-    times = list(zip(*lrc_list))[0]
-    times = list(dict.fromkeys(times))
-    nl = []
-    for time in times:
-        for item in lrc_list:
-            if time == item[0]:
-                nl.append(item)
-    return nl
+    return [item for items in group_by_time(lrc_list).values() for item in items]
 
 
-def choose_root(lrc_list: list) -> str:
+def choose_root(lrc_list: list, profiles=None) -> str:
     _lh, _lo, _lt = [], [], []
-    for y in lrc_list:
-        fk = bool(re.search(_pat4, y))
-        if bool(re.search(_pat3, y)):
+    for y, profile in zip(lrc_list, profiles or map(script_profile, lrc_list)):
+        fk = profile.kanji > 0
+        if profile.kana:
             if fk:
                 return y
             else:
                 _lh += [y]
         else:
-            if fk and checktrad(y):
+            if fk and profile.traditional:
                 _lt += [y]
             else:
                 _lo += [y]
@@ -285,33 +463,21 @@ def choose_root(lrc_list: list) -> str:
 
 
 # 提取歌词主干
-def get_lrc_root(lrc_list: list, flag=False) -> list:
+def get_lrc_root(lines: list) -> list:
+    """为每个时间戳选出歌词主干写入line.root，返回选出主干的LyricLine"""
     nl: list = []
-    px = ""
-    pyl: list = []
-    for n, (x, y) in enumerate(lrc_list):
-        if px != x:
-            num = len(pyl)
-            if num > 2:
-                if line := choose_root(pyl[1:]):
-                    nl += [[pyl[0], line]]
-                else:
-                    print(f"跳过:", pyl)
-            elif num == 2:
-                nl += [pyl]
-            pyl = [x]
-        if y:
-            pyl += [y]
-        px, py = x, y
-    else:
-        num = len(pyl)
-        if num > 2:
-            if line := choose_root(pyl[1:]):
-                nl += [[pyl[0], line]]
+    for line in lines:
+        texts = [y for y in line.texts if y]
+        if len(texts) > 1:
+            profiles = [p for y, p in zip(line.texts, line_profiles(line)) if y]
+            if root := choose_root(texts, profiles):
+                line.root = root
+                nl.append(line)
             else:
-                print(f"跳过:", pyl)
-        elif num == 2:
-            nl += [pyl]
+                logging.warning(f"跳过: {[line.tag] + texts}")
+        elif texts:
+            line.root = texts[0]
+            nl.append(line)
     return nl
 
 
@@ -323,7 +489,8 @@ def checktrans(_list: list):
     flag = False
     for t, l in _list:
         if l:
-            if not bool(re.search(_pat3, l)) and not l.isascii():
+            profile = script_profile(l)
+            if not profile.kana and not profile.is_ascii:
                 flag = True
         if time != t:
             if flag:
@@ -334,7 +501,7 @@ def checktrans(_list: list):
         else:
             linelist.append([t, l])
     for _, i in linelist:
-        if bool(re.search(_pat3, i)):
+        if script_profile(i).kana:
             return False
     return True
 
@@ -346,37 +513,47 @@ def movefile(_path, dire):
             makedirs(path.join(_dir, dire))
         except:
             ...
-    shutil.move(_path, path.join(_dir, dire, _name))
+    dest = path.join(_dir, dire, _name)
+    shutil.move(_path, dest)
+    return dest
 
 
 def arrangelines(inlines):
+    """将每个时间戳的候选行整理为原文/中文/假名/罗马音，写入LyricLine，返回整理成功的行"""
     outitems = []
+    groups = []
+    ambiguous = []  # 需要语言识别的候选行，整首歌一次识别
     for item in inlines:
-        num = 0
         _lh, _lo, _lc, _lr, _lt = [], [], [], [], []
-        line = [item[0]]
-        for y in item[1:]:
-            fk = bool(re.search(_pat4, y))
-            if bool(re.search(_pat3, y)):
+        for y, profile in zip(item.texts, line_profiles(item)):
+            fk = profile.kanji > 0
+            if profile.kana:
                 if fk:
                     _lr += [y]
                 else:
                     _lh += [y]
             else:
                 if fk:
-                    if checktrad(y):
+                    if profile.traditional:
                         _lt += [y]
                     else:
                         _lc += [y]
                 else:
                     _lo += [y]
+        groups.append((item, _lh, _lo, _lc, _lr, _lt))
+        if not _lr and len(_lc) > 1:
+            ambiguous += _lc
+    langs = classify_langs(ambiguous)
+    for item, _lh, _lo, _lc, _lr, _lt in groups:
+        num = 0
+        line = []
         flag = False
         if not _lr:
 
             if len(_lc) > 1:
                 confidence, text = None, None
                 for i in _lc:
-                    lang, conf = langid.classify(i)
+                    lang, conf = langs[i]
                     # print(lang, conf )
                     if lang == 'zh' and (confidence is None or conf > confidence):
                         confidence, text = conf, i
@@ -403,7 +580,7 @@ def arrangelines(inlines):
                             num += 1
                             lis[n] = [""]
                             break
-                    print("errortype1:", item)
+                    logging.warning(f"errortype1: {[item.tag, *item.texts]}")
                     # print("lis:", lis)
                     flag = True
                     break
@@ -432,7 +609,7 @@ def arrangelines(inlines):
                         num += 1
                         line.append(r)
                 else:
-                    print("errortype2:", item)
+                    logging.warning(f"errortype2: {[item.tag, *item.texts]}")
                     flag = True
                     break
             else:
@@ -443,18 +620,17 @@ def arrangelines(inlines):
         while "" in lis:
             lis.remove("")
         # print(line, item)
-        if len(lis) == len(item) - num:
-            outitems.append(line)
+        if len(lis) == len(item.texts) - num:
+            item.root, item.chin, item.hira, item.roma = line
+            outitems.append(item)
     return outitems
 
 if __name__ == "__main__":
     # print(spstring('Beautiful world...'))
     # print(checktrad("今百年戦争"))
-    lis = [['[01:59.670]', '糟糕讨厌的话 啦啦噜',  'ヤバイヤダしならららる'],
-           ['[00:12.460]', '想要使坏',  'イジワルしたい'],
-           ['[00:22.664]', '必须加以控制',  'コントロールしなきゃ'], ]
-    lis1 = [['[01:59.670]', '糟糕讨厌的话 啦啦噜', '[やばいやだ]しならららる', 'ヤバイヤダしならららる'],
-           ['[00:12.460]', '想要使坏', '[いじわる]したい', 'イジワルしたい'],
-           ['[00:22.664]', '必须加以控制', '[こんとろ]ー[る ]しなきゃ', 'コントロールしなきゃ'],
-            ['[00:12.380]', 'Ready to fly（一！二！三！四！）', '[r]eady to fly（one！two! three! four!）', 'Ready to fly（one！two! three! four!）']]
+    lis1 = [LyricLine(119670, ('糟糕讨厌的话 啦啦噜', '[やばいやだ]しならららる', 'ヤバイヤダしならららる')),
+            LyricLine(12460, ('想要使坏', '[いじわる]したい', 'イジワルしたい')),
+            LyricLine(22664, ('必须加以控制', '[こんとろ]ー[る ]しなきゃ', 'コントロールしなきゃ')),
+            LyricLine(12380, ('Ready to fly（一！二！三！四！）', '[r]eady to fly（one！two! three! four!）',
+                              'Ready to fly（one！two! three! four!）'))]
     print(arrangelines(lis1))
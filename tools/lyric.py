@@ -0,0 +1,139 @@
+import re
+import sys
+
+_pat1 = re.compile(r'\[[a-zA-Z]+:')
+_pat2 = re.compile(r'[词詞曲歌手制作人原唱]\s*[:∶：]')  # r'词：|曲：|歌手：'
+_pat5 = re.compile(r'\[(\d{1,3}):(\d{1,2})(?:[.:](\d{1,3}))?\]')
+
+
+def stringconv(text):
+    # 合并连续空白（含\xa0、\u3000）为单个空格
+    return " ".join(text.split())
+
+
+def format_time(ms: int) -> str:
+    """毫秒 -> mm:ss.xxx"""
+    return f"{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def tokenize_lrc(lrc_lines):
+    """
+    逐行扫描LRC歌词，生成 (类型, 毫秒时间戳, 内容)
+
+    类型:
+        "meta"    元信息行，如 [al:专辑]，时间戳为None
+        "credit"  词曲作者等署名行，时间戳为0
+        "timed"   带时间戳的歌词，一行有多个时间戳时按时间戳依次生成
+        "untimed" 没有时间戳的行，时间戳为None
+    空行、内容为空或为 "//"、含 " - " 的行被丢弃。lrc_lines可以是任意可迭代对象。
+    """
+    for line in lrc_lines:
+        if not line:
+            continue
+        line = stringconv(line)
+        if "[" in line and _pat1.search(line):
+            if ":" in line and len(line) < 100:
+                if line.split(":")[1].strip("]"):
+                    yield "meta", None, line
+            continue
+        # 一次遍历取出所有时间戳，并拼接时间戳之间的内容
+        times, parts, pos = [], [], 0
+        for match in _pat5.finditer(line):
+            _min, sec, ms = match.groups()
+            times.append(int(_min) * 60000 + int(sec) * 1000 + (int(ms.ljust(3, '0')) if ms else 0))
+            parts.append(line[pos:match.start()])
+            pos = match.end()
+        if not times:
+            yield "untimed", None, line
+            continue
+        parts.append(line[pos:])
+        content = "".join(parts).strip()
+        if not content or content == "//" or " - " in content:
+            continue
+        contents = content.split(" / ") if " / " in content else [content]
+        if _pat2.search(content):
+            for content in contents:
+                yield "credit", 0, content
+        else:
+            for time in times:
+                for content in contents:
+                    yield "timed", time, content
+
+
+class LyricLine:
+    """
+    单个时间戳的歌词
+
+    texts为该时间戳下读到的全部候选行（已去重），
+    root/chin/hira/roma为整理后的原文、中文翻译、假名注音与罗马音注音，
+    profiles为各候选行的字符构成（首次分类时计算，见 tools.lrc.line_profiles）。
+    """
+    __slots__ = ("time", "texts", "root", "chin", "hira", "roma", "profiles")
+
+    def __init__(self, time: int, texts=(), root="", chin="", hira="", roma=""):
+        self.time = time  # 毫秒
+        self.texts = texts
+        self.root = root
+        self.chin = chin
+        self.hira = hira
+        self.roma = roma
+        self.profiles = None
+
+    @property
+    def tag(self) -> str:
+        return f"[{format_time(self.time)}]"
+
+    def __repr__(self):
+        return f"LyricLine({self.tag}, {self.texts}, {self.root!r}, {self.chin!r}, {self.hira!r}, {self.roma!r})"
+
+
+class LyricDocument:
+    """
+    一首歌的歌词
+
+    meta     元信息行原文，如 [al:专辑]
+    credits  词曲署名，写出时时间戳为0
+    lines    按时间戳首次出现顺序排列的LyricLine
+    invalid  没有时间戳的行
+    output   处理结果 [(毫秒, 文本), ...]，写入时在meta与credits之后
+    """
+    __slots__ = ("meta", "credits", "lines", "invalid", "output")
+
+    def __init__(self, meta=None, credits=None, lines=None, invalid=None):
+        self.meta = meta or []
+        self.credits = credits or []
+        self.lines = lines or []
+        self.invalid = invalid or []
+        self.output = []
+
+    @classmethod
+    def parse(cls, lrc_lines):
+        """由read_lyrics读到的行构建，同一时间戳的重复行只保留一次"""
+        doc = cls()
+        groups = {}
+        for kind, time, content in tokenize_lrc(lrc_lines):
+            if kind == "timed":
+                groups.setdefault(time, {})[sys.intern(content)] = None
+            elif kind == "meta":
+                doc.meta.append(content)
+            elif kind == "credit":
+                doc.credits.append(content)
+            else:
+                doc.invalid.append(content)
+        doc.lines = [LyricLine(time, tuple(texts)) for time, texts in groups.items()]
+        return doc
+
+    def texts(self):
+        """依次生成所有候选行"""
+        for line in self.lines:
+            yield from line.texts
+
+    def to_lines(self) -> list:
+        """生成写入的LRC文本行"""
+        return (self.meta + [f"[00:00.000]{c}" for c in self.credits]
+                + [f"[{format_time(time)}]{text}" for time, text in self.output])
+
+    def synced(self) -> list:
+        """生成同步歌词 [(毫秒, 文本), ...]，按时间排序"""
+        lines = [(0, c.strip()) for c in self.credits] + [(t, x.strip()) for t, x in self.output]
+        return sorted([(t, x) for t, x in lines if x], key=lambda item: item[0])
@@ -0,0 +1,83 @@
+import logging
+import threading
+from concurrent.futures import Future
+
+
+def estimate_tokens(lines):
+    """粗略估算请求消耗的token数：输入句会在返回中原样重复并附带转化结果"""
+    return sum(len(line) for line in lines) * 3
+
+
+class RequestPacker:
+    """
+    将多首歌的歌词合并到同一个Deepseek请求中
+
+    各文件提交的句子按类型排队，估算token数达到预算、或排队linger秒后合并发出。
+    返回的 "输入句//转化句" 按内容路由回各文件的时间戳；
+    某文件的句子未能全部匹配时，剩余句子退回逐文件请求。
+    """
+
+    def __init__(self, dsapi, executor, budget=4000, linger=0.5):
+        self.dsapi = dsapi
+        self.executor = executor
+        self.budget = budget
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._pending = {}  # 类型 -> [(句子列表, 文件路径, Future), ...]
+        self._size = {}
+        self._timers = {}
+
+    def submit(self, kind, texts, inpath) -> Future:
+        """提交一个文件的LyricLine列表，返回结果与DSAPI.convert相同的Future"""
+        future = Future()
+        size = estimate_tokens(line.root for line in texts)
+        with self._lock:
+            if self._pending.get(kind) and self._size[kind] + size > self.budget:
+                self._flush(kind)
+            self._pending.setdefault(kind, []).append((texts, inpath, future))
+            self._size[kind] = self._size.get(kind, 0) + size
+            if self._size[kind] >= self.budget:
+                self._flush(kind)
+            elif kind not in self._timers:
+                timer = threading.Timer(self.linger, self.flush, (kind,))
+                timer.daemon = True
+                self._timers[kind] = timer
+                timer.start()
+        return future
+
+    def flush(self, kind):
+        with self._lock:
+            self._flush(kind)
+
+    def _flush(self, kind):
+        """（持锁调用）取出排队的文件，交给线程池发送"""
+        timer = self._timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+        jobs = self._pending.pop(kind, [])
+        self._size[kind] = 0
+        if jobs:
+            self.executor.submit(self._run, kind, jobs)
+
+    def _run(self, kind, jobs):
+        if len(jobs) == 1:
+            texts, inpath, future = jobs[0]
+            self._fallback(kind, texts, inpath, future, [])
+            return
+        try:
+            packed = self.dsapi.convert_packed(kind, [texts for texts, _, _ in jobs], jobs[0][1])
+        except Exception as e:
+            logging.warning(f"合并请求失败，改为逐文件请求:{kind} {e}")
+            packed = [([], texts) for texts, _, _ in jobs]
+        for (_, inpath, future), (output, leftovers) in zip(jobs, packed):
+            if leftovers:
+                self.executor.submit(self._fallback, kind, leftovers, inpath, future, output)
+            else:
+                future.set_result(output)
+
+    def _fallback(self, kind, texts, inpath, future, output):
+        """逐文件请求未匹配的句子"""
+        try:
+            future.set_result(self.dsapi.convert(kind, texts, inpath, output))
+        except Exception as e:
+            future.set_exception(e)
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import path, makedirs
+
+from tools.file import MusicLrcEditor
+from tools.lrc import check_jap
+from tools.lyric import LyricDocument
+
+SCAN_RESULTS = ("japanese", "unsynced", "non_japanese", "unreadable")
+SCAN_WORKERS = 8  # 扫描只读取标签，瓶颈在磁盘/网络IO，线程数可多于CPU核心数
+
+
+def read_and_classify(file):
+    """只读取歌词标签并分类，不注音、不移动文件，分类规则与正式处理一致
+    返回 (分类, 读到的歌词行)"""
+    mle = MusicLrcEditor(file)
+    if not mle.isreadlrc():
+        return "unreadable", []
+    lrc = mle.read_lyrics()
+    if not lrc:
+        return "unreadable", []
+    doc = LyricDocument.parse(lrc)
+    if not doc.lines:
+        return "unsynced", lrc
+    if not check_jap(doc.texts()):
+        return "non_japanese", lrc
+    return "japanese", lrc
+
+
+def scan_file(file) -> str:
+    return read_and_classify(file)[0]
+
+
+def scan_files(files, workers=SCAN_WORKERS):
+    """多线程扫描，按输入顺序生成 (路径, 分类)"""
+    with ThreadPoolExecutor(max(workers, 1)) as pool:
+        yield from zip(files, pool.map(scan_file, files))
+
+
+def read_list(list_path) -> list:
+    """读取文件列表：每行一个路径，忽略空行与#开头的行"""
+    with open(list_path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def write_list(list_path, files):
+    _dir = path.dirname(list_path)
+    if _dir and not path.exists(_dir):
+        makedirs(_dir, exist_ok=True)
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.writelines(path.abspath(file) + "\n" for file in files)
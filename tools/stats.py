@@ -0,0 +1,60 @@
+import threading
+from collections import deque
+from time import monotonic
+
+
+def format_duration(seconds) -> str:
+    """秒 -> h:mm:ss，None显示为 --"""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressStats:
+    """
+    批量处理进度统计（线程安全）
+
+    处理线程每完成一个文件调用 add，界面定时调用 snapshot 读取；
+    速度与单个文件平均耗时按最近window个文件滚动计算，处理停滞时速度随之下降。
+    """
+
+    def __init__(self, total=0, window=50):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset(total)
+
+    def reset(self, total=0):
+        with self._lock:
+            self.total = total
+            self.done = 0
+            self.counts = {}
+            self._start = monotonic()
+            self._finished = deque([self._start], maxlen=self.window + 1)  # 最近的完成时间
+            self._elapsed = deque(maxlen=self.window)  # 最近的单个文件耗时
+
+    def add(self, result, elapsed=None):
+        """记录一个文件的结果，elapsed为该文件的处理耗时（秒）"""
+        with self._lock:
+            self.done += 1
+            self.counts[result] = self.counts.get(result, 0) + 1
+            self._finished.append(monotonic())
+            if elapsed is not None:
+                self._elapsed.append(elapsed)
+
+    def snapshot(self) -> dict:
+        """返回当前统计：总数、已完成、各结果计数、速度(文件/秒)、平均耗时(秒)、剩余时间(秒)"""
+        with self._lock:
+            now = monotonic()
+            span = now - self._finished[0]
+            rate = (len(self._finished) - 1) / span if span > 0 else 0.0
+            avg = sum(self._elapsed) / len(self._elapsed) if self._elapsed else 0.0
+            remaining = max(self.total - self.done, 0)
+            return {"total": self.total, "done": self.done, "counts": dict(self.counts),
+                    "rate": rate, "avg": avg, "eta": remaining / rate if rate else None,
+                    "elapsed": now - self._start}
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        return (f"已处理 {snap['done']}/{snap['total']} 速度: {snap['rate']:.2f} 文件/秒 "
+                f"平均耗时: {snap['avg']:.2f} 秒 用时: {format_duration(snap['elapsed'])}")
@@ -0,0 +1,154 @@
+import cProfile
+import csv
+import heapq
+import json
+import marshal
+import math
+import threading
+from contextlib import contextmanager
+from os import path, makedirs
+from time import perf_counter, thread_time
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, q):
+    """最近秩法取百分位，values需已排序"""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[k]
+
+
+class StageTimer:
+    """
+    分阶段耗时统计（可选开启）
+
+    处理线程在文件开始/结束时调用 start/stop，各阶段用 with timer.stage(名称) 包裹，
+    记录每个文件各阶段的墙钟时间与本线程CPU时间。当前文件按线程保存，
+    DS模式多个文件并行处理时互不干扰；多进程时子进程只调用 start/stop，
+    由主进程用 add 汇总。profile_top>0 时对每个文件做cProfile，只保留最慢的N个。
+    """
+
+    def __init__(self, profile_top=0):
+        self.profile_top = profile_top
+        self.records = []
+        self._profiles = []  # 小顶堆 (总耗时, 序号, 文件, 统计)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, file):
+        prof = None
+        if self.profile_top:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:  # 同一时间只能有一个分析器（Python 3.12+），跳过该文件
+                prof = None
+        self._local.current = ({"file": file, "stages": {}}, perf_counter(), thread_time(), prof)
+
+    @contextmanager
+    def stage(self, name):
+        current = getattr(self._local, "current", None)
+        if current is None:
+            yield
+            return
+        t0, c0 = perf_counter(), thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = current[0]["stages"].get(name, (0.0, 0.0))
+            current[0]["stages"][name] = (wall + perf_counter() - t0, cpu + thread_time() - c0)
+
+    def stop(self, result):
+        """结束当前文件，返回 (记录, cProfile统计)，统计未开启时为None"""
+        record, t0, c0, prof = self._local.current
+        self._local.current = None
+        record["result"] = result
+        record["wall"] = perf_counter() - t0
+        record["cpu"] = thread_time() - c0
+        stats = None
+        if prof is not None:
+            prof.disable()
+            prof.create_stats()
+            stats = prof.stats
+        return record, stats
+
+    def add(self, record, stats=None):
+        with self._lock:
+            self.records.append(record)
+            if stats is not None:
+                item = (record["wall"], len(self.records), record["file"], stats)
+                if len(self._profiles) < self.profile_top:
+                    heapq.heappush(self._profiles, item)
+                elif item[0] > self._profiles[0][0]:
+                    heapq.heapreplace(self._profiles, item)
+
+    def summary(self) -> dict:
+        """各阶段的调用次数、总耗时与百分位（毫秒）"""
+        with self._lock:
+            records = list(self.records)
+        stages = {}
+        for record in records:
+            for name, times in record["stages"].items():
+                stages.setdefault(name, []).append(times)
+            stages.setdefault("total", []).append((record["wall"], record["cpu"]))
+        res = {}
+        for name, times in stages.items():
+            item = {"count": len(times)}
+            for i, kind in enumerate(("wall", "cpu")):
+                values = sorted(t[i] * 1e3 for t in times)
+                item[f"{kind}_sum"] = sum(values)
+                for q in PERCENTILES:
+                    item[f"{kind}_p{q}"] = percentile(values, q)
+                item[f"{kind}_max"] = values[-1]
+            res[name] = item
+        return res
+
+    def format_summary(self) -> str:
+        lines = [f"{'阶段':12s}{'次数':>6s}{'总计ms':>12s}" + "".join(f"{f'p{q}':>10s}" for q in PERCENTILES)
+                 + f"{'最大':>10s}{'CPU总计':>12s}"]
+        for name, item in sorted(self.summary().items(), key=lambda x: -x[1]["wall_sum"]):
+            lines.append(f"{name:14s}{item['count']:6d}{item['wall_sum']:12.1f}"
+                         + "".join(f"{item[f'wall_p{q}']:10.1f}" for q in PERCENTILES)
+                         + f"{item['wall_max']:10.1f}{item['cpu_sum']:12.1f}")
+        return "\n".join(lines)
+
+    def save(self, base) -> list:
+        """写入 base.timing.json（汇总与逐文件记录）、base.timing.csv（逐文件逐阶段）
+        以及 base.prof/ 下最慢文件的cProfile统计（可用pstats读取），返回写入的路径"""
+        _dir = path.dirname(base)
+        if _dir and not path.exists(_dir):
+            makedirs(_dir, exist_ok=True)
+        with self._lock:
+            records = list(self.records)
+            profiles = sorted(self._profiles, reverse=True)
+        json_path, csv_path = base + ".timing.json", base + ".timing.csv"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"files": len(records), "stages": self.summary(),
+                       "records": [{"file": r["file"], "result": r["result"],
+                                    "wall_ms": r["wall"] * 1e3, "cpu_ms": r["cpu"] * 1e3,
+                                    "stages": {name: {"wall_ms": wall * 1e3, "cpu_ms": cpu * 1e3}
+                                               for name, (wall, cpu) in r["stages"].items()}}
+                                   for r in records]},
+                      f, ensure_ascii=False, indent=1)
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "result", "stage", "wall_ms", "cpu_ms"])
+            for record in records:
+                for name, (wall, cpu) in record["stages"].items():
+                    writer.writerow([record["file"], record["result"], name, f"{wall * 1e3:.3f}", f"{cpu * 1e3:.3f}"])
+                writer.writerow([record["file"], record["result"], "total",
+                                 f"{record['wall'] * 1e3:.3f}", f"{record['cpu'] * 1e3:.3f}"])
+        saved = [json_path, csv_path]
+        if profiles:
+            prof_dir = base + ".prof"
+            if not path.exists(prof_dir):
+                makedirs(prof_dir)
+            for rank, (wall, _, file, stats) in enumerate(profiles, 1):
+                name = path.splitext(path.basename(file))[0]
+                prof_path = path.join(prof_dir, f"{rank:02d}-{wall * 1e3:.0f}ms-{name}.prof")
+                with open(prof_path, "wb") as f:
+                    marshal.dump(stats, f)  # 与cProfile.Profile.dump_stats格式相同
+                saved.append(prof_path)
+        return saved